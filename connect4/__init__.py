@@ -1,7 +1,11 @@
 from .game import Game
 from .game import Board
+from .game import CompactBoard
+from .game import SparseBoard
 from .player import Player
 from .player import Human
 from .player import Minimax
+from .tablebase import Tablebase
 
-__all__ = ['Game', 'Board', 'Player', 'Human', 'Minimax']
+__all__ = ['Game', 'Board', 'CompactBoard', 'SparseBoard',
+           'Player', 'Human', 'Minimax', 'Tablebase']
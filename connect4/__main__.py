@@ -6,6 +6,7 @@ from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 import argparse
 
+from . import profiling
 from .game import Game
 from .player import Human
 from .player import Player
@@ -42,13 +43,15 @@ def main():
                         '. (default: minimax)'
                         )
 
+    profiling.add_arguments(parser)
+
     args = parser.parse_args()
 
     player1 = players_choices[args.player1]
     player2 = players_choices[args.player2]
 
     g = Game((player1('X'), player2('O')))
-    g.run()
+    profiling.run(args, g.run)
 
 if __name__ == "__main__":
     main()
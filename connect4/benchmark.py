@@ -0,0 +1,76 @@
+"""
+This module compares the search algorithms of the
+:class:`Minimax <connect4.player.Minimax>` player.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import time
+
+from .player import Minimax
+from .transposition import TranspositionTable
+
+
+def compare_algorithms(board, player, depth=None,
+                       algorithms=Minimax.ALGORITHMS):
+    """Search the same board with each algorithm at equal depth.
+
+    Each algorithm is run the way it is meant to be used: with a fresh
+    transposition table and iterative deepening up to ``depth``, the
+    ``'pvs'`` iterations using :meth:`aspiration windows
+    <connect4.player.Minimax.aspiration_search>`. The table provides the
+    move ordering which principal variation search relies on. Both searches
+    are exact at ``depth``, so the scores must be identical, and so must the
+    best columns unless several columns share the best score: only the
+    number of visited nodes and the time differ. Neither algorithm visits
+    fewer nodes on every position.
+
+    Args:
+        board(:class:`Board <connect4.game.Board>`): The board to search.
+        player(:class:`Minimax <connect4.player.Minimax>`): The player to
+            move. Its opponent and ``to_win`` must be set.
+        depth(int, optional): The search depth. Default is the depth of the
+            player.
+        algorithms(tuple of str): The algorithms to compare.
+
+    Returns:
+        (list of dict): For each algorithm, its ``'algorithm'``, the best
+        ``'col'``, the ``'score'``, the number of nodes ``'n_nodes'`` and the
+        ``'time'`` in seconds.
+    """
+
+    depth = player.depth if depth is None else depth
+
+    results = []
+    for algorithm in algorithms:
+        searcher = Minimax(player.coin, depth=depth, algorithm=algorithm,
+                           tt_mb=player.tt_mb)
+        searcher.opponent = player.opponent
+        searcher.to_win = player.to_win
+        searcher.tt = TranspositionTable.from_megabytes(searcher.tt_mb)
+
+        node = searcher.root_node(board)
+        start = time.time()
+        if algorithm == 'pvs':
+            searcher.aspiration_search(node)
+        else:
+            for d in range(1, depth + 1):
+                searcher.minimax(node, d, -searcher.INF, searcher.INF)
+        results.append({'algorithm': algorithm,
+                        'col': node.col_to_play,
+                        'score': node.score,
+                        'n_nodes': searcher.n_nodes,
+                        'time': time.time() - start})
+
+    return results
+
+
+def print_comparison(results):
+    """Print the output of :func:`compare_algorithms` as a table."""
+
+    print('{0:>10s} {1:>4s} {2:>8s} {3:>10s} {4:>8s}'.format(
+          'algorithm', 'col', 'score', 'nodes', 'time'))
+    for r in results:
+        print('{0:>10s} {1:>4d} {2:>8} {3:>10d} {4:>8.3f}'.format(
+              r['algorithm'], r['col'] + 1, r['score'], r['n_nodes'],
+              r['time']))
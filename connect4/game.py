@@ -1,5 +1,6 @@
 """
-This module contains the :class:`Board` and the :class:`Game` class.
+This module contains the :class:`Board`, :class:`CompactBoard`,
+:class:`SparseBoard` and the :class:`Game` class.
 """
 
 # Note: some (great) implementation ideas were inspired by Patrick Westerhoff:
@@ -7,6 +8,8 @@ This module contains the :class:`Board` and the :class:`Game` class.
 
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import struct
+import time
 from itertools import chain
 from itertools import groupby
 
@@ -16,7 +19,159 @@ except NameError:
     pass
 
 
-class Board:
+class BaseBoard(object):
+    """The base class of :class:`Board` and :class:`CompactBoard`.
+
+    It implements all the board methods in terms of the ``grid`` attribute,
+    the number of rows and columns and :meth:`is_free`. Subclasses may
+    override them with faster versions.
+    """
+
+    __slots__ = ()
+
+    EMPTY = '.'
+
+    def free_columns(self):
+        """Generator function to iterate over all free columns
+
+        Returns:
+            All free columns."""
+
+        return (col for col in range(self.n_cols) if self.is_free(col))
+
+    def candidate_columns(self):
+        """Return the columns worth considering for the next move.
+
+        For a regular board, these are all the free columns.
+
+        Returns:
+            (list): The candidate columns.
+        """
+
+        return list(self.free_columns())
+
+    def occupied(self):
+        """Generator function to iterate over all the coins of the board.
+
+        Returns:
+            All ``(row, col, coin)`` triplets of non-empty cells.
+        """
+
+        return ((row, col, cell)
+                for row, line in enumerate(self.grid)
+                for col, cell in enumerate(line)
+                if cell != self.EMPTY)
+
+    def is_full(self):
+        """Check if the board is full.
+
+        Returns:
+            ``True`` if the board is full, else ``False``.
+        """
+
+        return all(not self.is_free(col) for col in range(self.n_cols))
+
+    def all_sequences(self, to_win=1):
+        """Generator function to iterate over all sequences of the board.
+
+        A sequence is either a row, a column or a diagonal.
+
+        Args:
+            to_win(int, optional): The number of successive coins needed to win
+                a game. Only diagonals with a length greater or equal to
+                ``to_win`` will be yielded.
+
+        Returns:
+            All sequences.
+        """
+
+        grid = self.grid
+
+        def diagonals():
+            """Generator function to iterate over all the diagonals."""
+
+            # Note : we actually yield a list and not just a generator so that
+            # diagonals can be iterated multiple times.
+
+            start = to_win - 1
+            end = self.n_rows + self.n_cols - to_win
+            pos_diag_indices = (((r - c, c) for c in range(self.n_cols))
+                                for r in range(start, end))
+            start = to_win - self.n_cols
+            end = self.n_rows - to_win + 1
+            neg_diag_indices = (((r + c, c) for c in range(self.n_cols))
+                                for r in range(start, end))
+
+            for d in chain(pos_diag_indices, neg_diag_indices):
+                yield [grid[i][j] for (i, j) in d
+                       if 0 <= i < self.n_rows and
+                       0 <= j < self.n_cols]
+
+        rows = grid
+        columns = zip(*grid)
+
+        return chain(rows, columns, diagonals())
+
+    def connects(self, row, col, to_win):
+        """Check if the coin at given position is part of ``to_win`` aligned
+        coins.
+
+        This is much faster than :meth:`winning_coin` when only the last
+        inserted coin can make a player win.
+
+        Args:
+            row(int): The row.
+            col(int): The column.
+            to_win(int): The number of successive coins needed to win.
+
+        Returns:
+            ``True`` if the coin is part of a winning sequence, else
+            ``False``.
+        """
+
+        coin = self.grid[row][col]
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            n = 1
+            for sign in (1, -1):
+                r, c = row + sign * dr, col + sign * dc
+                while (0 <= r < self.n_rows and 0 <= c < self.n_cols and
+                       self.grid[r][c] == coin):
+                    n += 1
+                    r, c = r + sign * dr, c + sign * dc
+            if n >= to_win:
+                return True
+
+        return False
+
+    def winning_coin(self, to_win):
+        """Look for ``to_win`` aligned coins.
+
+        Args:
+            to_win(int): The number of successive coins needed to win.
+
+        Returns:
+            (str): The coin of the winner, or ``None`` if there is no winner.
+        """
+
+        # for every line, column and diag, check if there are at least 'to_win'
+        # pieces of the same color that are aligned.
+        for sequence in self.all_sequences():
+            for coin, group in groupby(sequence):
+                if coin != self.EMPTY and len(list(group)) >= to_win:
+                    return coin
+
+        return None
+
+    def __str__(self):
+
+        s = ' '.join('{0:2s}'.format(str(i + 1))
+                     for i in range(self.n_cols)) + '\n'
+        s += '\n'.join('  '.join(cell for cell in row)
+                       for row in self.grid)
+        return s
+
+
+class Board(BaseBoard):
     """The Board class.
 
     Args:
@@ -30,8 +185,6 @@ class Board:
             ``n_cols`` matrix.
     """
 
-    EMPTY = '.'
-
     def __init__(self, n_rows, n_cols):
 
         self.n_rows = n_rows
@@ -63,6 +216,27 @@ class Board:
 
         return r
 
+    def remove(self, col):
+        """Remove the top coin of given column.
+
+        Args:
+            col(int): The column.
+
+        Returns:
+            row(int): The row where the coin was removed.
+        Raises:
+            ValueError: if ``col`` is empty.
+        """
+
+        try:
+            r = next(r for r in range(self.n_rows)
+                     if self.grid[r][col] != self.EMPTY)
+            self.grid[r][col] = self.EMPTY
+        except StopIteration:
+            raise ValueError('Column ' + str(col) + ' is empty.')
+
+        return r
+
     def is_free(self, col):
         """Check if a coin can be inserted in given column.
 
@@ -75,6 +249,442 @@ class Board:
 
         return self.grid[0][col] == self.EMPTY
 
+
+class CompactBoard(BaseBoard):
+    """A compact board, cheap to copy and to send to other processes.
+
+    Cells are stored in a single ``bytearray`` (``0`` for an empty cell, else
+    the index of the coin in :attr:`coins` plus one), and the instances have
+    no ``__dict__``. A board pickles to a few dozen bytes, its cells being
+    packed in a single integer.
+
+    Args:
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+
+    Attributes:
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+        coins(tuple of str): The coins that appear on the board, in order of
+            first insertion.
+        cells(bytearray): The content of the cells, row by row from the top.
+        heights(bytearray): The number of coins of each column.
+    """
+
+    __slots__ = ('n_rows', 'n_cols', 'coins', 'cells', 'heights')
+
+    _header = struct.Struct('<HHB')
+
+    def __init__(self, n_rows, n_cols):
+
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.coins = ()
+        self.cells = bytearray(n_rows * n_cols)
+        self.heights = bytearray(n_cols)
+
+    @classmethod
+    def from_board(cls, board):
+        """Build a compact board with the same content as another board.
+
+        Args:
+            board: A :class:`Board`, :class:`SparseBoard` or
+                :class:`CompactBoard`.
+
+        Returns:
+            (:class:`CompactBoard`): The new board.
+        """
+
+        compact = cls(board.n_rows, board.n_cols)
+        for row, col, coin in sorted(board.occupied(), reverse=True):
+            if coin not in compact.coins:
+                compact.coins += (coin,)
+            compact.cells[row * board.n_cols + col] = (
+                compact.coins.index(coin) + 1)
+            compact.heights[col] += 1
+        return compact
+
+    @property
+    def grid(self):
+        """The board as a ``n_rows`` * ``n_cols`` matrix, like
+        :attr:`Board.grid`. This is a copy: modifying it has no effect on the
+        board."""
+
+        symbols = (self.EMPTY,) + self.coins
+        n = self.n_cols
+        return [[symbols[c] for c in self.cells[row * n:(row + 1) * n]]
+                for row in range(self.n_rows)]
+
+    def insert(self, col, coin):
+        """Insert a piece in given column.
+
+        Args:
+            col(int): The column.
+            coin(str): The coin to insert.
+
+        Returns:
+            row(int): The row where the coin was inserted.
+        Raises:
+            ValueError: if ``col`` is full or is out of range.
+        """
+
+        if col < 0 or col >= self.n_cols:
+            raise ValueError('Invalid column ' + str(col) + '.')
+        if self.heights[col] == self.n_rows:
+            raise ValueError('Column ' + str(col) + ' is already full.')
+
+        if coin not in self.coins:
+            self.coins += (coin,)
+        r = self.n_rows - 1 - self.heights[col]
+        self.cells[r * self.n_cols + col] = self.coins.index(coin) + 1
+        self.heights[col] += 1
+
+        return r
+
+    def remove(self, col):
+        """Remove the top coin of given column.
+
+        Args:
+            col(int): The column.
+
+        Returns:
+            row(int): The row where the coin was removed.
+        Raises:
+            ValueError: if ``col`` is empty.
+        """
+
+        if not self.heights[col]:
+            raise ValueError('Column ' + str(col) + ' is empty.')
+
+        self.heights[col] -= 1
+        r = self.n_rows - 1 - self.heights[col]
+        self.cells[r * self.n_cols + col] = 0
+
+        return r
+
+    def is_free(self, col):
+        """Check if a coin can be inserted in given column.
+
+        Args:
+            col(int): The column
+
+        Returns:
+            ``True`` if the column is free, else ``False``.
+        """
+
+        return self.heights[col] < self.n_rows
+
+    def occupied(self):
+        """Generator function to iterate over all the coins of the board.
+
+        Returns:
+            All ``(row, col, coin)`` triplets of non-empty cells.
+        """
+
+        return ((i // self.n_cols, i % self.n_cols, self.coins[c - 1])
+                for i, c in enumerate(self.cells) if c)
+
+    def is_full(self):
+        """Check if the board is full.
+
+        Returns:
+            ``True`` if the board is full, else ``False``.
+        """
+
+        return sum(self.heights) == self.n_rows * self.n_cols
+
+    def connects(self, row, col, to_win):
+        """Check if the coin at given position is part of ``to_win`` aligned
+        coins.
+
+        Args:
+            row(int): The row.
+            col(int): The column.
+            to_win(int): The number of successive coins needed to win.
+
+        Returns:
+            ``True`` if the coin is part of a winning sequence, else
+            ``False``.
+        """
+
+        n_rows, n_cols, cells = self.n_rows, self.n_cols, self.cells
+        c = cells[row * n_cols + col]
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            n = 1
+            for sign in (1, -1):
+                r, cc = row + sign * dr, col + sign * dc
+                while (0 <= r < n_rows and 0 <= cc < n_cols and
+                       cells[r * n_cols + cc] == c):
+                    n += 1
+                    r, cc = r + sign * dr, cc + sign * dc
+            if n >= to_win:
+                return True
+
+        return False
+
+    def copy(self):
+        """Return a copy of the board.
+
+        Returns:
+            (:class:`CompactBoard`): The copy.
+        """
+
+        board = CompactBoard.__new__(CompactBoard)
+        board.n_rows = self.n_rows
+        board.n_cols = self.n_cols
+        board.coins = self.coins
+        board.cells = bytearray(self.cells)
+        board.heights = bytearray(self.heights)
+        return board
+
+    def to_bytes(self):
+        """Serialize the board.
+
+        The serialization is canonical: it only depends on the content of the
+        board, not on the order in which the coins were inserted.
+
+        Returns:
+            (bytes): The geometry, the coins and the cells of the board.
+        """
+
+        # Keep the coins that are on the board, in sorted order.
+        present = sorted(set(self.coins[c - 1] for c in self.cells if c))
+        table = bytearray(256)
+        for i, coin in enumerate(self.coins):
+            if coin in present:
+                table[i + 1] = present.index(coin) + 1
+
+        coins = b''.join(struct.pack('<B', len(c)) + c
+                         for c in (coin.encode('utf-8') for coin in present))
+        return (self._header.pack(self.n_rows, self.n_cols, len(present)) +
+                coins + bytes(self.cells.translate(table)))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Build a board serialized with :meth:`to_bytes`.
+
+        Args:
+            data(bytes): The serialized board.
+
+        Returns:
+            (:class:`CompactBoard`): The board.
+        """
+
+        data = bytearray(data)
+        n_rows, n_cols, n_coins = cls._header.unpack_from(bytes(data), 0)
+        offset = cls._header.size
+        coins = []
+        for _ in range(n_coins):
+            length = data[offset]
+            coins.append(bytes(data[offset + 1:offset + 1 + length])
+                         .decode('utf-8'))
+            offset += 1 + length
+
+        board = cls(n_rows, n_cols)
+        board.coins = tuple(coins)
+        board.cells = data[offset:offset + n_rows * n_cols]
+        for i, c in enumerate(board.cells):
+            if c:
+                board.heights[i % n_cols] += 1
+        return board
+
+    def __reduce__(self):
+
+        # Pickling is meant to be cheap, so the cells are sent as they are
+        # (unlike to_bytes, which is canonical), one octal digit per cell
+        # packed in a single integer.
+        if len(self.coins) < 8:
+            cells = int(bytes(self.cells.translate(_TO_OCTAL)), 8)
+        else:
+            cells = bytes(self.cells)
+        return (_compact_board, (self.n_rows, self.n_cols, self.coins, cells))
+
+    def __eq__(self, other):
+
+        return (isinstance(other, CompactBoard) and
+                self.to_bytes() == other.to_bytes())
+
+    def __ne__(self, other):
+
+        return not self == other
+
+    __hash__ = None
+
+
+# Translation tables between cell values and octal digits.
+_TO_OCTAL = bytearray(256)
+_TO_OCTAL[:8] = b'01234567'
+_FROM_OCTAL = bytearray(256)
+_FROM_OCTAL[ord('0'):ord('8')] = bytearray(range(8))
+
+
+def _compact_board(n_rows, n_cols, coins, cells):
+    """Unpickle a :class:`CompactBoard`."""
+
+    board = CompactBoard.__new__(CompactBoard)
+    board.n_rows = n_rows
+    board.n_cols = n_cols
+    board.coins = coins
+    if isinstance(cells, bytes):
+        board.cells = bytearray(cells)
+    else:
+        digits = format(cells, 'o').rjust(n_rows * n_cols, '0')
+        board.cells = bytearray(digits.encode('ascii')).translate(_FROM_OCTAL)
+    board.heights = bytearray(n_rows - board.cells[col::n_cols].count(0)
+                              for col in range(n_cols))
+    return board
+
+
+class SparseBoard:
+    """A board for large geometries that only stores the occupied cells.
+
+    Instead of scanning the whole grid, the board keeps track of every
+    *window* (i.e. every horizontal, vertical or diagonal segment of
+    ``to_win`` cells) that contains at least one coin. Win detection and
+    evaluation are then updated incrementally on each insertion or removal,
+    so that memory and time per move scale with the number of coins, not with
+    the board area.
+
+    Args:
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+        to_win(int): The number of successive coins needed to win.
+        radius(int): Only the free columns at distance at most ``radius`` of
+            an occupied column are candidates for the next move. Default is
+            ``2``.
+
+    Attributes:
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+        to_win(int): The number of successive coins needed to win.
+        cells(dict): The coin of each occupied ``(row, col)`` cell.
+        heights(dict): The number of coins of each non-empty column.
+        windows(dict): For every window containing at least a coin, the number
+            of coins of each player. Windows are identified by their first
+            cell and their direction.
+        potential(dict): For each coin, the sum of :math:`l^2` over all the
+            windows containing :math:`l` coins of this player and none of the
+            opponent.
+    """
+
+    EMPTY = Board.EMPTY
+    DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+    def __init__(self, n_rows, n_cols, to_win, radius=2):
+
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.to_win = to_win
+        self.radius = radius
+        self.cells = {}
+        self.heights = {}
+        self.windows = {}
+        self.potential = {}
+        self._n_wins = {}
+
+    def _windows_through(self, row, col):
+        """Generator function to iterate over the ids of all the windows
+        containing the cell (``row``, ``col``)."""
+
+        n = self.to_win - 1
+        for dr, dc in self.DIRECTIONS:
+            for k in range(self.to_win):
+                r, c = row - k * dr, col - k * dc
+                if (0 <= r < self.n_rows and 0 <= c < self.n_cols and
+                        0 <= r + n * dr < self.n_rows and
+                        0 <= c + n * dc < self.n_cols):
+                    yield (r, c, dr, dc)
+
+    def _update_windows(self, row, col, coin, delta):
+        """Add (or remove) the coin at (``row``, ``col``) to all its windows,
+        and update the potentials and the number of wins."""
+
+        for w in self._windows_through(row, col):
+            counts = self.windows.setdefault(w, {})
+            if len(counts) == 1 and coin not in counts:
+                # the window was owned by the opponent, and is now dead.
+                other, = counts
+                self.potential[other] -= delta * counts[other]**2
+            elif len(counts) <= 1:
+                l = counts.get(coin, 0)
+                self.potential[coin] = (self.potential.get(coin, 0) +
+                                        (l + delta)**2 - l**2)
+                if l + delta == self.to_win or l == self.to_win:
+                    self._n_wins[coin] = self._n_wins.get(coin, 0) + delta
+            counts[coin] = counts.get(coin, 0) + delta
+            if not counts[coin]:
+                del counts[coin]
+                if not counts:
+                    del self.windows[w]
+                elif len(counts) == 1:
+                    # the window is owned by the opponent again.
+                    other, = counts
+                    self.potential[other] += counts[other]**2
+
+    def insert(self, col, coin):
+        """Insert a piece in given column.
+
+        Args:
+            col(int): The column.
+            coin(str): The coin to insert.
+
+        Returns:
+            row(int): The row where the coin was inserted.
+        Raises:
+            ValueError: if ``col`` is full or is out of range.
+        """
+
+        if col < 0 or col >= self.n_cols:
+            raise ValueError('Invalid column ' + str(col) + '.')
+        if not self.is_free(col):
+            raise ValueError('Column ' + str(col) + ' is already full.')
+
+        h = self.heights.get(col, 0)
+        r = self.n_rows - 1 - h
+        self.heights[col] = h + 1
+        self.cells[(r, col)] = coin
+        self._update_windows(r, col, coin, 1)
+
+        return r
+
+    def remove(self, col):
+        """Remove the top coin of given column.
+
+        Args:
+            col(int): The column.
+
+        Returns:
+            row(int): The row where the coin was removed.
+        Raises:
+            ValueError: if ``col`` is empty.
+        """
+
+        h = self.heights.get(col, 0)
+        if not h:
+            raise ValueError('Column ' + str(col) + ' is empty.')
+
+        r = self.n_rows - h
+        if h == 1:
+            del self.heights[col]
+        else:
+            self.heights[col] = h - 1
+        coin = self.cells.pop((r, col))
+        self._update_windows(r, col, coin, -1)
+
+        return r
+
+    def is_free(self, col):
+        """Check if a coin can be inserted in given column.
+
+        Args:
+            col(int): The column
+
+        Returns:
+            ``True`` if the column is free, else ``False``.
+        """
+
+        return self.heights.get(col, 0) < self.n_rows
+
     def free_columns(self):
         """Generator function to iterate over all free columns
 
@@ -83,6 +693,33 @@ class Board:
 
         return (col for col in range(self.n_cols) if self.is_free(col))
 
+    def candidate_columns(self):
+        """Return the columns worth considering for the next move.
+
+        These are the free columns close to an occupied column, or the central
+        column if the board is empty.
+
+        Returns:
+            (list): The candidate columns, sorted.
+        """
+
+        if not self.heights:
+            return [self.n_cols // 2]
+
+        cols = set(c for col in self.heights
+                   for c in range(max(0, col - self.radius),
+                                  min(self.n_cols, col + self.radius + 1)))
+        return sorted(c for c in cols if self.is_free(c))
+
+    def occupied(self):
+        """Generator function to iterate over all the coins of the board.
+
+        Returns:
+            All ``(row, col, coin)`` triplets of non-empty cells.
+        """
+
+        return ((row, col, coin) for (row, col), coin in self.cells.items())
+
     def is_full(self):
         """Check if the board is full.
 
@@ -90,53 +727,56 @@ class Board:
             ``True`` if the board is full, else ``False``.
         """
 
-        return all(not self.is_free(col) for col in range(self.n_cols))
+        return len(self.cells) == self.n_rows * self.n_cols
 
-    def all_sequences(self, to_win=1):
-        """Generator function to iterate over all sequences of the board.
-
-        A sequence is either a row, a column or a diagonal.
+    def connects(self, row, col, to_win=None):
+        """Check if the coin at given position is part of ``to_win`` aligned
+        coins.
 
         Args:
-            to_win(int, optional): The number of successive coins needed to win
-                a game. Only diagonals with a length greater or equal to
-                ``to_win`` will be yielded.
+            row(int): The row.
+            col(int): The column.
+            to_win(int, optional): Must be the ``to_win`` value of the board,
+                which is used if not given.
 
         Returns:
-            All sequences.
+            ``True`` if the coin is part of a winning sequence, else
+            ``False``.
         """
 
-        def diagonals():
-            """Generator function to iterate over all the diagonals."""
+        if to_win is not None and to_win != self.to_win:
+            raise ValueError('A sparse board only detects wins of ' +
+                             str(self.to_win) + ' coins.')
 
-            # Note : we actually yield a list and not just a generator so that
-            # diagonals can be iterated multiple times.
+        coin = self.cells.get((row, col))
+        return any(self.windows[w].get(coin) == self.to_win
+                   for w in self._windows_through(row, col)
+                   if w in self.windows)
 
-            start = to_win - 1
-            end = self.n_rows + self.n_cols - to_win
-            pos_diag_indices = (((r - c, c) for c in range(self.n_cols))
-                                for r in range(start, end))
-            start = to_win - self.n_cols
-            end = self.n_rows - to_win + 1
-            neg_diag_indices = (((r + c, c) for c in range(self.n_cols))
-                                for r in range(start, end))
+    def winning_coin(self, to_win=None):
+        """Look for ``to_win`` aligned coins.
 
-            for d in chain(pos_diag_indices, neg_diag_indices):
-                yield [self.grid[i][j] for (i, j) in d
-                       if 0 <= i < self.n_rows and
-                       0 <= j < self.n_cols]
+        Args:
+            to_win(int, optional): Must be the ``to_win`` value of the board,
+                which is used if not given.
 
-        rows = self.grid
-        columns = zip(*self.grid)
+        Returns:
+            (str): The coin of the winner, or ``None`` if there is no winner.
+        """
 
-        return chain(rows, columns, diagonals())
+        if to_win is not None and to_win != self.to_win:
+            raise ValueError('A sparse board only detects wins of ' +
+                             str(self.to_win) + ' coins.')
+
+        return next((coin for coin, n in self._n_wins.items() if n), None)
 
     def __str__(self):
 
         s = ' '.join('{0:2s}'.format(str(i + 1))
                      for i in range(self.n_cols)) + '\n'
-        s += '\n'.join('  '.join(cell for cell in row)
-                       for row in self.grid)
+        s += '\n'.join('  '.join(self.cells.get((row, col), self.EMPTY)
+                                for col in range(self.n_cols))
+                       for row in range(self.n_rows))
         return s
 
 
@@ -150,19 +790,43 @@ class Game:
         n_cols(int): The number of columns of the board. Default is ``7``.
         to_win(int): The number of aligned pieces required to win the game.
             Default is ``4``.
+        sparse(bool): Whether to use a :class:`SparseBoard` instead of a
+            :class:`Board`. Sparse boards are much faster for large
+            geometries. Default is ``False``.
+        time_control(tuple, optional): A ``(base, increment)`` tuple of
+            seconds. Each player starts with ``base`` seconds on its clock,
+            and gets ``increment`` seconds after each of its moves. A player
+            whose clock runs out loses the game. Default is ``None``, i.e. no
+            time limit.
+        verbose(bool): Whether to print the board and the moves. If
+            ``False``, the ``verbose`` attribute of the players (if any) is
+            turned off too. Default is ``True``.
 
     Attributes:
         player1(:class:`Player <connect4.player.Player>`): The first
             player.
         player2(:class:`Player <connect4.player.Player>`): The second
             player.
-        board(:class:`Board`): The board.
+        board(:class:`Board` or :class:`SparseBoard`): The board.
         to_win(int): The number of aligned pieces required to win the game.
+        clocks(dict): The remaining time in seconds of each player, or
+            ``None`` if there is no time control.
+        moves(list): The ``(coin, col, seconds)`` triplets of all the moves
+            played so far, ``seconds`` being the time taken by the player to
+            choose the column.
+        winner(:class:`Player <connect4.player.Player>`): The winner, once
+            the game is over.
+        flagged(:class:`Player <connect4.player.Player>`): The player whose
+            clock ran out, if any.
         """
 
-    def __init__(self, players, n_rows=6, n_cols=7, to_win=4):
+    def __init__(self, players, n_rows=6, n_cols=7, to_win=4, sparse=False,
+                 time_control=None, verbose=True):
 
-        self.board = Board(n_rows, n_cols)
+        if sparse:
+            self.board = SparseBoard(n_rows, n_cols, to_win)
+        else:
+            self.board = Board(n_rows, n_cols)
 
         self.player1, self.player2 = players
         self.player1.opponent = self.player2
@@ -173,6 +837,24 @@ class Game:
         if self.player1.coin == self.player2.coin:
             raise ValueError('Both players have the same coin.')
 
+        self.player1.reset()
+        self.player2.reset()
+
+        self.time_control = time_control
+        self.clocks = None
+        if time_control is not None:
+            self.clocks = {self.player1: time_control[0],
+                           self.player2: time_control[0]}
+        self.verbose = verbose
+        if not verbose:
+            # Headless games are silent, players included.
+            for player in players:
+                if hasattr(player, 'verbose'):
+                    player.verbose = False
+        self.moves = []
+        self.winner = None
+        self.flagged = None
+
     def check_winner(self):
         """Check if there's a winner at the current game state.
 
@@ -181,16 +863,10 @@ class Game:
             player has won yet, ``None`` is returned.
         """
 
-        # for every line, column and diag, check if there are at least 'to_win'
-        # pieces of the same color that are aligned.
-        for sequence in self.board.all_sequences():
-            for coin, group in groupby(sequence):
-                if (coin != self.board.EMPTY and
-                   len(list(group)) >= self.to_win):
-                    return (self.player1 if coin == self.player1.coin else
-                            self.player2)
-
-        return None
+        coin = self.board.winning_coin(self.to_win)
+        if coin is None:
+            return None
+        return self.player1 if coin == self.player1.coin else self.player2
 
     def run(self):
         """Run a game session between the two players.
@@ -203,20 +879,49 @@ class Game:
         current_player = self.player1
 
         while winner is None and not self.board.is_full():
-            print(self.board)
-            col = current_player.play(self.board)
-            print('Player {0} plays in column {1}.'.format(
-                  current_player, col + 1))
+            self._print(self.board)
+
+            start = time.time()
+            if self.clocks is None:
+                # Players written before clocks existed may not accept
+                # time_left.
+                col = current_player.play(self.board)
+            else:
+                col = current_player.play(
+                    self.board, time_left=self.clocks[current_player])
+            elapsed = time.time() - start
+            self.moves.append((current_player.coin, col, elapsed))
+
+            if self.clocks is not None:
+                self.clocks[current_player] -= elapsed
+                if self.clocks[current_player] < 0:
+                    self._print('Player {0} ran out of time.'.format(
+                                current_player))
+                    self.flagged = current_player
+                    winner = current_player.opponent
+                    break
+                self.clocks[current_player] += self.time_control[1]
+
+            self._print('Player {0} plays in column {1}.'.format(
+                        current_player, col + 1))
             self.board.insert(col, current_player.coin)
+            self.player1.observe(col, current_player.coin)
+            self.player2.observe(col, current_player.coin)
             winner = self.check_winner()
             current_player = (self.player1 if current_player == self.player2
                               else self.player2)
-            print()
+            self._print()
 
-        print(self.board)
+        self._print(self.board)
         if winner is not None:
-            print('Player {0} won the game!'.format(winner))
+            self._print('Player {0} won the game!'.format(winner))
         else:
-            print("There's no winner. You're both LOSERS.")
+            self._print("There's no winner. You're both LOSERS.")
 
+        self.winner = winner
         return winner
+
+    def _print(self, *args):
+
+        if self.verbose:
+            print(*args)
@@ -0,0 +1,130 @@
+"""
+This module contains the Lazy SMP parallel search of the
+:class:`Minimax <connect4.player.Minimax>` player.
+
+All the worker processes run the same iterative deepening search on the same
+position, and only communicate through a shared transposition table. The
+workers start at different depths and search the columns in different orders,
+so that they quickly fill the table with entries that are useful to the
+others. The first worker that completes the target depth supplies the move.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import multiprocessing
+import time
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty  # Python 2
+
+from .game import Board
+from .game import CompactBoard
+
+
+# How often the workers are checked while waiting for a result, in seconds.
+POLL = .1
+
+
+def _worker(player, board, worker_id, results, stop):
+    """Run an iterative deepening search and put its result in the
+    ``results`` queue, unless ``stop`` is set first."""
+
+    player.worker_id = worker_id
+    player.n_workers = 1
+
+    # Helpers skip some of the first iterations, so that they don't all
+    # search the same depth at the same time, and half of them search one
+    # more ply. They also each search the columns in their own order (see
+    # Minimax.ordered_columns).
+    start = min(1 + worker_id % 3, player.depth)
+    extra = (worker_id // 3) % 2 if worker_id else 0
+    for depth in range(start, player.depth + extra + 1):
+        if stop.is_set():
+            return
+        node = player.root_node(board)
+        player.minimax(node, depth, alpha=-player.INF, beta=player.INF)
+
+    results.put((worker_id, node.col_to_play, node.score))
+
+
+def lazy_smp(player, board, timeout=None):
+    """Search the best column to play with ``player.n_workers`` processes.
+
+    The player's transposition table must be a
+    :class:`SharedTranspositionTable
+    <connect4.transposition.SharedTranspositionTable>`.
+
+    Args:
+        player(:class:`Minimax <connect4.player.Minimax>`): The player.
+        board(:class:`Board <connect4.game.Board>`): The current board.
+        timeout(float, optional): The maximum time of the search, in seconds.
+            If no worker completes the target depth in time, the best column
+            stored in the transposition table for the current position is
+            returned.
+
+    Returns:
+        (:class:`Node <connect4.player.Node>`): The root node of the search,
+        with its column to play and score set.
+    Raises:
+        RuntimeError: if all the workers died without a result.
+    """
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    # Regular boards are sent as compact boards, which pickle to a fraction
+    # of the size.
+    shipped = (CompactBoard.from_board(board) if isinstance(board, Board)
+               else board)
+    workers = [multiprocessing.Process(target=_worker,
+                                       args=(player, shipped, worker_id,
+                                             results, stop))
+               for worker_id in range(player.n_workers)]
+    for worker in workers:
+        worker.daemon = True
+        worker.start()
+
+    deadline = None if timeout is None else time.time() + timeout
+    col = score = None
+    try:
+        while True:
+            wait = POLL
+            if deadline is not None:
+                wait = min(wait, deadline - time.time())
+                if wait <= 0:
+                    break
+            try:
+                _, col, score = results.get(timeout=wait)
+                break
+            except Empty:
+                pass
+            if not any(worker.is_alive() for worker in workers):
+                # A result may have been put right before the last exit.
+                try:
+                    _, col, score = results.get(timeout=POLL)
+                except Empty:
+                    raise RuntimeError(
+                        'All the search workers died (exit codes {0}).'
+                        .format(', '.join(str(worker.exitcode)
+                                          for worker in workers)))
+                break
+    finally:
+        # The other workers have no use anymore. Those that are still in the
+        # middle of an iteration are killed: an interrupted write can't
+        # corrupt the table.
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=.05)
+            if worker.is_alive():
+                worker.terminate()
+                worker.join()
+
+    node = player.root_node(board)
+    if col is None:
+        entry = player.tt.probe(node.key)
+        if entry is not None and entry[3] is not None:
+            score, _, _, col = entry
+        else:
+            col = player.ordered_columns(board)[0]
+    node.col_to_play, node.score = col, score
+    return node
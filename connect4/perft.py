@@ -0,0 +1,236 @@
+"""
+This module contains a *perft* (performance test) move generation counter.
+
+:func:`perft` plays all the move sequences of a given length from a position,
+and counts the positions that are reached, the wins and the draws. The counts
+only depend on the rules of the game, so they are a regression test for the
+board implementations (:class:`Board <connect4.game.Board>`,
+:class:`CompactBoard <connect4.game.CompactBoard>`, :class:`SparseBoard
+<connect4.game.SparseBoard>`), and the number of positions per second is a
+raw measure of their speed.
+
+Example::
+
+    $ python -m connect4.perft -depth 7 -board compact -check
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import sys
+import time
+
+from . import profiling
+from .game import Board
+from .game import CompactBoard
+from .game import SparseBoard
+
+
+# Reference counts of perft(depth) = (leaves, wins, draws), by
+# (n_rows, n_cols, to_win, moves) where moves are the columns played from the
+# empty board. Note that the usual Connect4 perft figures don't count the
+# terminal positions reached before the last move as leaves: e.g. 5673234
+# instead of 5686266 - 13032 at depth 8.
+REFERENCE = {
+    (6, 7, 4, ()): {
+        1: (7, 0, 0),
+        2: (49, 0, 0),
+        3: (343, 0, 0),
+        4: (2401, 0, 0),
+        5: (16807, 0, 0),
+        6: (117649, 0, 0),
+        7: (823536, 13032, 0),
+        8: (5686266, 57462, 0),
+    },
+    (6, 7, 4, (3, 3, 4, 2)): {
+        1: (7, 0, 0),
+        2: (49, 0, 0),
+        3: (343, 12, 0),
+        4: (2329, 12, 0),
+        5: (16230, 780, 0),
+        6: (108898, 1727, 0),
+    },
+    (4, 4, 3, ()): {
+        1: (4, 0, 0),
+        2: (16, 0, 0),
+        3: (64, 0, 0),
+        4: (256, 0, 0),
+        5: (1020, 108, 0),
+        6: (3696, 292, 0),
+        7: (13440, 2584, 0),
+        8: (43104, 8790, 0),
+        9: (131674, 43538, 0),
+        10: (337388, 120812, 0),
+    },
+}
+
+
+def side_to_move(board, coins=('X', 'O')):
+    """Return the coin of the player to move, assuming that ``coins[0]``
+    played first.
+
+    Args:
+        board: The board.
+        coins(tuple of str): The coins of the two players.
+
+    Returns:
+        (str): The coin to play.
+    """
+
+    n = [0, 0]
+    for _, _, coin in board.occupied():
+        n[coins.index(coin)] += 1
+    return coins[0] if n[0] <= n[1] else coins[1]
+
+
+def perft(board, depth, to_win=4, coins=('X', 'O')):
+    """Count the positions reachable from a board in ``depth`` moves.
+
+    All the move sequences of ``depth`` moves are played, except that the
+    game stops on a win or on a full board: such a position is a leaf
+    whatever its depth.
+
+    The board is left unchanged.
+
+    Args:
+        board: The board to start from. It must not be a terminal position.
+        depth(int): The number of moves.
+        to_win(int): The number of aligned coins needed to win. Default is
+            ``4``.
+        coins(tuple of str): The coins of the two players. The first one is
+            the first to play (see :func:`side_to_move`).
+
+    Returns:
+        (dict): The number of ``'leaves'`` (positions after exactly ``depth``
+        moves, or terminal positions), of ``'wins'`` and ``'draws'`` (terminal
+        positions, at any depth), of ``'nodes'`` (all positions, not counting
+        the board itself) and the ``'time'`` in seconds.
+    """
+
+    counts = {'leaves': 0, 'wins': 0, 'draws': 0, 'nodes': 0}
+    coin = side_to_move(board, coins)
+    other = coins[1] if coin == coins[0] else coins[0]
+    n_empty = (board.n_rows * board.n_cols -
+               sum(1 for _ in board.occupied()))
+
+    start = time.time()
+    if depth > 0:
+        _perft(board, depth, to_win, coin, other, n_empty, counts)
+    counts['time'] = time.time() - start
+
+    return counts
+
+
+def _perft(board, depth, to_win, coin, other, n_empty, counts):
+    """Recursive part of :func:`perft`."""
+
+    for col in range(board.n_cols):
+        if not board.is_free(col):
+            continue
+        row = board.insert(col, coin)
+        counts['nodes'] += 1
+        if board.connects(row, col, to_win):
+            counts['wins'] += 1
+            counts['leaves'] += 1
+        elif n_empty == 1:
+            counts['draws'] += 1
+            counts['leaves'] += 1
+        elif depth == 1:
+            counts['leaves'] += 1
+        else:
+            _perft(board, depth - 1, to_win, other, coin, n_empty - 1,
+                   counts)
+        board.remove(col)
+
+
+def make_board(n_rows=6, n_cols=7, to_win=4, moves=(), kind='dense',
+               coins=('X', 'O')):
+    """Build a board by playing some moves from the empty board.
+
+    Args:
+        n_rows(int): The number of rows.
+        n_cols(int): The number of columns.
+        to_win(int): The number of aligned coins needed to win.
+        moves(iterable of int): The columns to play, ``coins[0]`` first.
+        kind(str): ``'dense'`` for a :class:`Board
+            <connect4.game.Board>`, ``'compact'`` for a :class:`CompactBoard
+            <connect4.game.CompactBoard>` or ``'sparse'`` for a
+            :class:`SparseBoard <connect4.game.SparseBoard>`.
+        coins(tuple of str): The coins of the two players.
+
+    Returns:
+        The board.
+    """
+
+    if kind == 'sparse':
+        board = SparseBoard(n_rows, n_cols, to_win)
+    elif kind == 'compact':
+        board = CompactBoard(n_rows, n_cols)
+    else:
+        board = Board(n_rows, n_cols)
+    for i, col in enumerate(moves):
+        board.insert(col, coins[i % 2])
+    return board
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+             description='Count the positions reachable in a given number ' +
+                         'of moves, and measure the speed of the board.',
+             epilog='Example: python -m connect4.perft -depth 7 ' +
+                    '-board compact -check')
+
+    parser.add_argument('-depth', type=int, default=6,
+                        help='The maximum number of moves. (default: 6)')
+    parser.add_argument('-rows', type=int, default=6,
+                        help='The number of rows. (default: 6)')
+    parser.add_argument('-cols', type=int, default=7,
+                        help='The number of columns. (default: 7)')
+    parser.add_argument('-to-win', type=int, default=4,
+                        help='The number of aligned coins needed to win. ' +
+                        '(default: 4)')
+    parser.add_argument('-moves', type=str, default='',
+                        help='The columns played from the empty board, ' +
+                        'starting from 1, e.g. 4453. (default: none)')
+    parser.add_argument('-board', type=str, default='dense',
+                        choices=('dense', 'compact', 'sparse'),
+                        help='The board implementation. (default: dense)')
+    parser.add_argument('-check', action='store_true',
+                        help='Compare the counts with the reference counts.')
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    moves = tuple(int(c) - 1 for c in args.moves)
+    board = make_board(args.rows, args.cols, args.to_win, moves, args.board)
+    reference = REFERENCE.get((args.rows, args.cols, args.to_win, moves), {})
+    if args.check and not reference:
+        parser.error('There are no reference counts for this position.')
+
+    def run():
+
+        ok = True
+        print('{0:>5s} {1:>10s} {2:>8s} {3:>8s} {4:>8s} {5:>10s}'.format(
+              'depth', 'leaves', 'wins', 'draws', 'time', 'nodes/s'))
+        for depth in range(1, args.depth + 1):
+            counts = perft(board, depth, args.to_win)
+            line = '{0:5d} {1:10d} {2:8d} {3:8d} {4:8.2f} {5:10.0f}'.format(
+                   depth, counts['leaves'], counts['wins'], counts['draws'],
+                   counts['time'],
+                   counts['nodes'] / max(counts['time'], 1e-9))
+            if args.check and depth in reference:
+                if (counts['leaves'], counts['wins'],
+                        counts['draws']) == reference[depth]:
+                    line += '  ok'
+                else:
+                    line += '  expected {0} {1} {2}'.format(*reference[depth])
+                    ok = False
+            print(line)
+        return ok
+
+    if not profiling.run(args, run):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,34 @@ This module contains the :class:`Player` class and all derived player classes.
 
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
+import math
 import random
+import time
 from itertools import groupby
 try:
     from itertools import zip_longest
 except ImportError:
     from itertools import izip_longest as zip_longest  # Python 2
 
+from .game import SparseBoard
+from .parallel import lazy_smp
+from .transposition import EvaluationCache
+from .transposition import SharedTranspositionTable
+from .transposition import TranspositionTable
+from .transposition import Zobrist
+
+
+# The score of a won position, see Minimax.WIN. A module constant, so that the
+# search doesn't look it up as an attribute at every node.
+WIN = 10**9
+
+
+class SearchTimeout(Exception):
+    """Raised by :meth:`Minimax.minimax` when the time allotted to the
+    current move is over."""
+
+    pass
+
 
 class Player:
     """The Player base class.
@@ -29,11 +50,29 @@ class Player:
         self.opponent = None  # will be set by the game
         self.to_win = None  # will be set by the game
 
-    def play(self, board):
+    def reset(self):
+        """Prepare the player for a new game. Called by the game."""
+
+        pass
+
+    def observe(self, col, coin):
+        """Get notified of a move. Called by the game after each move of
+        both players.
+
+        Args:
+            col(int): The column that was played.
+            coin(str): The coin that was inserted.
+        """
+
+        pass
+
+    def play(self, board, time_left=None):
         """Choose a random column to play on.
 
         Args:
             board(:class:`Board <connect4.game.Board>`): The current board.
+            time_left(float, optional): The remaining time on the player's
+                clock, in seconds. ``None`` if the game has no time control.
 
         Returns:
             (int): The column to play on.
@@ -62,11 +101,13 @@ class Human(Player):
 
         Player.__init__(self, coin)
 
-    def play(self, board):
+    def play(self, board, time_left=None):
         """Ask user where he/she wants to play.
 
         Args:
             board(:class:`Board <connect4.game.Board>`): The current board.
+            time_left(float, optional): The remaining time on the player's
+                clock, in seconds.
 
         Returns:
             (int): The column to play on.
@@ -93,12 +134,115 @@ class Minimax(Player):
     Args:
         coin(str): The coin representing the user.
         depth: The maximum depth of the minimax algorithm. Default is ``5``.
+        n_workers(int): The number of processes used to search a move. If
+            greater than ``1``, a Lazy SMP search is run: all the processes
+            search the same position with slightly different move orderings
+            and depths, sharing a single transposition table. Default is
+            ``1``.
+        tt_mb(int): The size in megabytes of the transposition table.
+            Default is ``16``.
+        algorithm(str): The search algorithm. Either ``'alphabeta'`` for a
+            plain alpha/beta search, or ``'pvs'`` for a principal variation
+            search: only the first child of a node is searched with the full
+            window, the others are first searched with a null window to prove
+            they are not better, and searched again if the proof fails. With
+            ``'pvs'``, :meth:`play` also uses iterative deepening with
+            aspiration windows. Default is ``'alphabeta'``.
+        aspiration(int): The half width of the aspiration windows around the
+            score of the previous iteration. Only used with ``'pvs'``. Default
+            is ``25``.
+        eval_cache_mb(float): The memory budget in megabytes of the cache of
+            :meth:`utility` values. The cache is kept across moves and games.
+            Default is ``0``, i.e. no cache.
+        endgame_cells(int or str): Once the number of empty cells is at most
+            ``endgame_cells``, the position is solved exactly (see
+            :meth:`solve`) instead of being searched up to ``depth``. If
+            ``'auto'``, the position is solved as soon as the solve is
+            estimated to take no longer than the previous searches. Default is
+            ``'auto'``.
+        endgame_cache_mb(float): The memory budget in megabytes of the cache
+            of the exact solver. Default is ``4``.
+        reuse_state(bool): Whether to keep the search state (transposition
+            table, principal variation and history of the moves that caused
+            cutoffs) from one move to the next, until :meth:`reset` is
+            called. A transposition table is always used when ``n_workers >
+            1``. Default is ``True``.
+        store(str): The path of a persistent store of search results (see
+            :class:`PersistentStore <connect4.store.PersistentStore>`, an
+            instance can be passed too), shared with other processes and kept
+            across runs. The results of the searches at depth
+            ``STORE_MIN_DEPTH`` or more are read from and written to it.
+            Default is ``None``.
+        verbose(bool): Whether to print the root node of each search. A
+            :class:`Game <connect4.game.Game>` that isn't verbose turns it
+            off. Default is ``True``.
+
+    Attributes:
+        tt(:class:`TranspositionTable
+            <connect4.transposition.TranspositionTable>`): The transposition
+            table used by :meth:`minimax`, or ``None``.
+        n_nodes(int): The number of nodes visited by the last search.
+        pv(list): The principal variation, i.e. the columns expected to be
+            played from the current position.
+        history(dict): For each ``(coin, col)`` move, a score increased each
+            time the move caused a cutoff. Moves with a high score are
+            searched first.
+        eval_cache(:class:`EvaluationCache
+            <connect4.transposition.EvaluationCache>`): The cache of
+            :meth:`utility` values, or ``None``.
+        zobrist(:class:`Zobrist <connect4.transposition.Zobrist>`): The
+            hashing of the positions of the last searched board, or ``None``.
     """
 
-    def __init__(self, coin, depth=5):
+    ALGORITHMS = ('alphabeta', 'pvs')
+
+    # The score of a won position, minus the number of plies needed to win.
+    # Any score above WIN_THRESHOLD is a win. All scores are within
+    # (-INF, INF).
+    WIN = WIN
+    WIN_THRESHOLD = WIN - 10**6
+    INF = WIN + 1
+
+    # Shallower searches are too cheap to be worth sharing.
+    STORE_MIN_DEPTH = 3
+
+    def __init__(self, coin, depth=5, n_workers=1, tt_mb=16,
+                 algorithm='alphabeta', aspiration=25, eval_cache_mb=0,
+                 endgame_cells='auto', endgame_cache_mb=4, reuse_state=True,
+                 store=None, verbose=True):
+
+        if algorithm not in self.ALGORITHMS:
+            raise ValueError('Unknown algorithm ' + str(algorithm) + '.')
 
         Player.__init__(self, coin)
         self.depth = depth
+        self.algorithm = algorithm
+        self.aspiration = aspiration
+        self.n_nodes = 0
+        self.n_workers = n_workers
+        self.tt_mb = tt_mb
+        self.tt = None
+        self.reuse_state = reuse_state
+        if isinstance(store, str):
+            # Imported here so that 'python -m connect4.store' doesn't import
+            # the module twice.
+            from .store import PersistentStore
+            store = PersistentStore(store)
+        self.store = store
+        self.verbose = verbose
+        self.pv = []
+        self.history = {}
+        self._observed = []  # moves played since the last search
+        self.eval_cache = (EvaluationCache(eval_cache_mb) if eval_cache_mb
+                           else None)
+        self.endgame_cells = endgame_cells
+        self.endgame_cache = EvaluationCache(endgame_cache_mb)
+        self._max_search_nodes = 0  # the solve budget for endgame_cells='auto'
+        self._search_rate = None  # nodes per second of the last search
+        self.zobrist = None
+        self._deadline = None  # the time at which the search must stop
+        self.worker_id = 0  # only used for move ordering in Lazy SMP
+        self._worker_orders = {}  # column orders of a Lazy SMP helper
 
     def utility(self, board):
         """The utility function to evaluate the *goodness* of a board for the
@@ -106,14 +250,19 @@ class Minimax(Player):
 
         Right now, the evaluation is as follows:
 
-            - If the player wins, :math:`\infty` is returned.
-            - If he loses, :math:`-\infty` is returned.
+            - If the player wins, ``WIN`` is returned.
+            - If he loses, ``-WIN`` is returned.
             - If there is no winner, the utility value starts from :math:`0`
               and inscremented by :math:`l^2` for each sequence of length
               :math:`l` that could lead to a win for the player, and
               decremented by the same amount for each sequence that could lead
               to a win for the opponent.
 
+        For a :class:`SparseBoard <connect4.game.SparseBoard>`, the windows
+        of ``to_win`` cells are used instead of the sequences of coins: each
+        window with :math:`l` coins of a single player is worth :math:`l^2`.
+        These values are maintained by the board so nothing is recomputed.
+
         Args:
             board(:class:`Board <connect4.game.Board>`): The board to evaluate.
 
@@ -121,6 +270,15 @@ class Minimax(Player):
             The estimated utility of the board.
         """
 
+        if isinstance(board, SparseBoard):
+            winner = board.winning_coin()
+            if winner == self.coin:
+                return self.WIN
+            elif winner == self.opponent.coin:
+                return -self.WIN
+            return (board.potential.get(self.coin, 0) -
+                    board.potential.get(self.opponent.coin, 0))
+
         def pred_current_next(iterable, fill_pred, fill_next):
             """Generator function that will yield each element of the iterable,
             surrounded by it's previous and next element. Default values for
@@ -146,9 +304,9 @@ class Minimax(Player):
                 l = len(current_group)
                 if l >= self.to_win:
                     if current_coin == self.coin:
-                        return float('inf')
+                        return self.WIN
                     elif current_coin == self.opponent.coin:
-                        return float('-inf')
+                        return -self.WIN
                 else:
                     mul = (pred_coin == '.' and
                            l + len(pred_group) >= self.to_win)
@@ -160,8 +318,9 @@ class Minimax(Player):
                         h -= mul * l**2
 
         # Try to force central playing
+        grid = board.grid
         for row in range(1, board.n_rows // 2):
-            h += board.grid[-row][board.n_cols // 2] == self.coin
+            h += grid[-row][board.n_cols // 2] == self.coin
 
         return h
 
@@ -177,6 +336,13 @@ class Minimax(Player):
         their score. Once done, the current node score is updated (depending on
         the player) and the column that leads to the best score is also set.
 
+        If a transposition table :attr:`tt` is set, it is used to skip the
+        search of already explored nodes and to try their best column first.
+
+        The search is fail-soft: when the score of the node is outside of
+        the (``alpha``, ``beta``) window, it is still a valid bound of the
+        true score, which is what makes null-window searches worthwhile.
+
         Args:
             node(Node): The current node.
             depth(int): The current depth
@@ -185,29 +351,76 @@ class Minimax(Player):
                 so far.
         """
 
+        self.n_nodes += 1
+        if self._deadline is not None and time.time() > self._deadline:
+            raise SearchTimeout()
+
+        # Look for the node in the transposition table, then in the store.
+        # The root node is always searched so that its column to play is set.
+        entry = None
+        if self.tt is not None:
+            entry = self.tt.probe(node.key)
+        if (entry is None and self.store is not None and
+                depth >= self.STORE_MIN_DEPTH):
+            entry = self.store.probe(node.key)
+        if entry is not None and node.col_played is not None:
+            tt_score, bound, tt_depth, _ = entry
+            tt_score = self.from_table(tt_score, node.ply)
+            if tt_depth >= depth and (
+                    bound == TranspositionTable.EXACT or
+                    (bound == TranspositionTable.LOWER and
+                     tt_score >= beta) or
+                    (bound == TranspositionTable.UPPER and
+                     tt_score <= alpha)):
+                node.score = tt_score
+                return
+
         # Compute utility of current node: if there's a winner, we want to stop
         # the search.
-        score = self.utility(node.board)
+        score = None
+        if self.eval_cache is not None:
+            score = self.eval_cache.get(node.key)
+        if score is None:
+            score = self.utility(node.board)
+            if self.eval_cache is not None:
+                self.eval_cache.put(node.key, score)
 
         # Stop the search if the maximum depth is reached, if there's a winner
-        # or if the board is full.
+        # or if the board is full. Wins are scored by their distance to the
+        # root, so that the fastest ones are preferred.
         if (depth == 0 or
-            score in (float('-inf'), float('inf')) or
+            abs(score) == WIN or
             node.board.is_full()):  # noqa
 
+            if score == WIN:
+                score -= node.ply
+            elif score == -WIN:
+                score += node.ply
             node.score = score
             return
 
+        alpha_orig, beta_orig = alpha, beta
+        # The best column of a previous search of this node is tried first.
+        if entry is not None:
+            first = entry[3]
+        elif node.col_played is None and self.pv:
+            first = self.pv[0]
+        else:
+            first = node.col_to_play
+        cols = self.ordered_columns(node.board, first=first,
+                                    coin=node.player.coin)
+
+        # If all moves are lost, the first one is played anyway.
         best_child = Node(board=None,
                           player=None,
-                          col_played=None,
+                          col_played=cols[0],
                           col_to_play=None,
-                          score=(float('-inf') if node.player is self
-                                 else float('inf')),
+                          score=(-self.INF if node.player is self
+                                 else self.INF),
                           childs=[])
 
         # For every possible move
-        for col in node.board.free_columns():
+        for i, col in enumerate(cols):
 
             # Build a child node with an updated board. We'll need to delete
             # the coin later as the same board object is shared among all
@@ -220,13 +433,37 @@ class Minimax(Player):
                          col_played=col,
                          col_to_play=None,  # will be set later on
                          score=None,  # will be set later on
-                         childs=[]  # will be set later on
+                         childs=[],  # will be set later on
+                         ply=node.ply + 1,
+                         key=(None if node.key is None else
+                              self.zobrist.move(node.key, row, col,
+                                                node.player.coin))
                          )
 
-            self.minimax(child, depth - 1, alpha, beta)
-
-            # Now delete the child's move from the board
-            child_board.grid[row][col] = child_board.EMPTY
+            # Try to prove with a null window that the child is not better
+            # than the best one so far. If it is, search it again with the
+            # full window to get its score. This requires a finite bound.
+            try:
+                probe = self.algorithm == 'pvs' and i > 0
+                if probe and node.player is self and alpha != -self.INF:
+                    self.minimax(child, depth - 1, alpha, alpha + 1)
+                elif probe and node.player is not self and beta != self.INF:
+                    self.minimax(child, depth - 1, beta - 1, beta)
+                else:
+                    probe = False
+                    self.minimax(child, depth - 1, alpha, beta)
+
+                # The failed probe already bounds the score of the child, so
+                # it is searched again with the window narrowed on that side.
+                if probe and alpha < child.score < beta:
+                    if node.player is self:
+                        self.minimax(child, depth - 1, child.score, beta)
+                    else:
+                        self.minimax(child, depth - 1, alpha, child.score)
+            finally:
+                # Now delete the child's move from the board (even if the
+                # search timed out).
+                child_board.remove(col)
 
             # Update the best_child, alpha, beta and prune if needed.
             if node.player is self:
@@ -239,33 +476,577 @@ class Minimax(Player):
                 beta = min(beta, best_child.score)
 
             if beta <= alpha:
+                if self.reuse_state:
+                    move = (node.player.coin, col)
+                    self.history[move] = self.history.get(move, 0) + depth**2
                 break
 
         # And most importantly, set the column to play and the node score.
         node.col_to_play = best_child.col_played
         node.score = best_child.score
 
-    def play(self, board):
-        """Choose a column to play on based on the minimax algorithm.
+        if node.score <= alpha_orig:
+            bound = TranspositionTable.UPPER
+        elif node.score >= beta_orig:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        score = self.to_table(node.score, node.ply)
+        if self.tt is not None:
+            self.tt.store(node.key, score, bound, depth, node.col_to_play)
+        if self.store is not None and depth >= self.STORE_MIN_DEPTH:
+            self.store.store(node.key, score, bound, depth, node.col_to_play)
+
+    def to_table(self, score, ply):
+        """Convert a score to be stored in a table.
+
+        Scores of wins and losses depend on their distance to the root of the
+        search. In tables, they are stored relative to the node at ``ply``
+        instead, so that they remain valid in other searches.
+
+        Args:
+            score(int): The score.
+            ply(int): The distance between the node and the root.
+
+        Returns:
+            (int): The score to store.
+        """
+
+        if score >= self.WIN_THRESHOLD:
+            return score + ply
+        elif score <= -self.WIN_THRESHOLD:
+            return score - ply
+        return score
+
+    def from_table(self, score, ply):
+        """Convert a score read from a table, reverting :meth:`to_table`.
+
+        Args:
+            score(int): The stored score.
+            ply(int): The distance between the node and the root.
+
+        Returns:
+            (int): The score.
+        """
+
+        if score >= self.WIN_THRESHOLD:
+            return score - ply
+        elif score <= -self.WIN_THRESHOLD:
+            return score + ply
+        return score
+
+    def ordered_columns(self, board, first=None, coin=None):
+        """Return the candidate columns of a board, in the order they should
+        be searched.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The board.
+            first(int, optional): A column to search first, typically the best
+                column found by a previous search.
+            coin(str, optional): The coin to play. If given, the columns are
+                sorted by decreasing :attr:`history` score.
+
+        Returns:
+            (list): The candidate columns.
+        """
+
+        cols = board.candidate_columns()
+
+        # Lazy SMP helpers search the columns in their own random order so
+        # that they don't all explore the same nodes at the same time.
+        if self.worker_id and cols:
+            order = self._worker_orders.get(len(cols))
+            if order is None:
+                order = list(range(len(cols)))
+                random.Random('{0}/{1}'.format(self.worker_id,
+                                               len(cols))).shuffle(order)
+                self._worker_orders[len(cols)] = order
+            cols = [cols[i] for i in order]
+
+        if coin is not None and self.history:
+            cols.sort(key=lambda col: -self.history.get((coin, col), 0))
+
+        if first in cols:
+            cols.remove(first)
+            cols.insert(0, first)
+
+        return cols
+
+    def root_node(self, board):
+        """Build the root node of a search.
 
         Args:
             board(:class:`Board <connect4.game.Board>`): The current board.
 
         Returns:
-            (int): The column to play on.
+            (Node): The root node.
         """
 
-        node = Node(board=board,
+        key = None
+        if (self.tt is not None or self.eval_cache is not None or
+                self.store is not None):
+            key = self.zobrist_for(board).key(board)
+
+        return Node(board=board,
                     player=self,
                     col_played=None,
                     col_to_play=None,
                     score=None,
-                    childs=[])
-        self.minimax(node, self.depth, alpha=float('-inf'), beta=float('inf'))
+                    childs=[],
+                    key=key)
+
+    def zobrist_for(self, board):
+        """Return the Zobrist hashing of the positions of a board.
+
+        Building the random numbers costs as much as the area of the board,
+        so they are kept in :attr:`zobrist` until the geometry, ``to_win``
+        or the coins change.
 
-        print(node)
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The board.
+
+        Returns:
+            (:class:`Zobrist <connect4.transposition.Zobrist>`): The hashing.
+        """
+
+        coins = (self.coin, self.opponent.coin)
+        z = self.zobrist
+        if z is None or (z.n_rows, z.n_cols, z.to_win, z.coins) != (
+                board.n_rows, board.n_cols, self.to_win, coins):
+            self.zobrist = Zobrist(board.n_rows, board.n_cols, self.to_win,
+                                   coins)
+        return self.zobrist
+
+    def play(self, board, time_left=None):
+        """Choose a column to play on based on the minimax algorithm.
+
+        If ``time_left`` is given, the search is run with iterative deepening
+        and stopped once the time budgeted for the move (see
+        :meth:`move_budget`) is over. The column found by the last completed
+        iteration is then played. An exact solve (see :meth:`solves_endgame`)
+        may only use ``SOLVE_SHARE`` of the budget, the search falls back to
+        iterative deepening afterwards.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The current board.
+            time_left(float, optional): The remaining time on the player's
+                clock, in seconds.
+
+        Returns:
+            (int): The column to play on.
+        """
+
+        budget = None
+        if time_left is not None:
+            budget = self.move_budget(board, time_left)
+
+        self.n_nodes = 0
+        if self.tt is None and self.n_workers > 1:
+            self.tt = SharedTranspositionTable.from_megabytes(self.tt_mb)
+        elif self.tt is None and self.reuse_state:
+            self.tt = TranspositionTable.from_megabytes(self.tt_mb)
+        self.reroot()
+
+        start = time.time()
+        node = None
+        if self.solves_endgame(board, budget):
+            # If the solve takes longer than estimated, the rest of the
+            # budget is left to the usual search.
+            if budget is not None:
+                self._deadline = start + budget * self.SOLVE_SHARE
+            try:
+                node = self.solve(board)
+            except SearchTimeout:
+                pass
+            finally:
+                self._deadline = None
+        solved = node is not None
+        if budget is not None:
+            budget = max(0, budget - (time.time() - start))
+
+        if solved:
+            pass
+        elif self.n_workers > 1:
+            node = lazy_smp(self, board, timeout=budget)
+        else:
+            node = self.root_node(board)
+            if budget is not None:
+                self._deadline = time.time() + budget
+            try:
+                if self.algorithm == 'pvs':
+                    self.aspiration_search(node)
+                elif budget is not None:
+                    for depth in range(1, self.depth + 1):
+                        self.minimax(node, depth, alpha=-self.INF,
+                                     beta=self.INF)
+                else:
+                    self.minimax(node, self.depth, alpha=-self.INF,
+                                 beta=self.INF)
+            except SearchTimeout:
+                if node.col_to_play is None:
+                    node.col_to_play = self.ordered_columns(board)[0]
+            finally:
+                self._deadline = None
+
+        if solved:
+            self.pv = [node.col_to_play]
+        else:
+            self._max_search_nodes = max(self._max_search_nodes,
+                                         self.n_nodes)
+            self._search_rate = self.n_nodes / max(time.time() - start,
+                                                   1e-6)
+            if self.reuse_state:
+                self.pv = self.principal_variation(board)
+
+        if self.verbose:
+            print(node)
         return node.col_to_play
 
+    # The part of the remaining time that may be used, the rest is kept as a
+    # safety margin.
+    TIME_SAFETY = .8
+
+    def move_budget(self, board, time_left):
+        """Return the time to spend on the next move.
+
+        The remaining time is shared evenly between the moves the player may
+        still have to play.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The current board.
+            time_left(float): The remaining time on the player's clock, in
+                seconds.
+
+        Returns:
+            (float): The time budget of the move, in seconds.
+        """
+
+        empty = board.n_rows * board.n_cols - sum(1 for _ in board.occupied())
+        moves_left = max(1, (empty + 1) // 2)
+        return max(0, time_left) * self.TIME_SAFETY / moves_left
+
+    # The number of nodes of a solve is estimated as
+    # n_free_cols ** (empty_cells * SOLVE_EXPONENT), and a solve node costs
+    # about SOLVE_NODE_COST times as much as a search node.
+    SOLVE_EXPONENT = .3
+    SOLVE_NODE_COST = .15
+    # The part of the time budget of a move that a solve may use before
+    # falling back to the usual search.
+    SOLVE_SHARE = .5
+
+    def solves_endgame(self, board, budget=None):
+        """Check if a position should be solved exactly rather than searched
+        up to ``depth``.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The current board.
+            budget(float, optional): The time budget of the move, in seconds.
+                The position isn't solved if the solve is estimated to take
+                longer, at the speed of the previous searches.
+
+        Returns:
+            ``True`` if the position should be solved, else ``False``.
+        """
+
+        empty = board.n_rows * board.n_cols - sum(1 for _ in board.occupied())
+        if self.endgame_cells == 'auto' and self._max_search_nodes <= 0:
+            return False  # no search yet
+        if self.endgame_cells != 'auto' and empty > self.endgame_cells:
+            return False
+        n_cols = sum(1 for _ in board.free_columns())
+        if n_cols <= 1:
+            return True
+
+        # Compared in log space: the estimate overflows on large boards.
+        cost = (empty * self.SOLVE_EXPONENT * math.log(n_cols) +
+                math.log(self.SOLVE_NODE_COST))  # in search nodes
+        if self.endgame_cells == 'auto' and \
+           cost > math.log(self._max_search_nodes):
+            return False
+        if budget is not None and self._search_rate:
+            nodes = budget * self.SOLVE_SHARE * self._search_rate
+            return nodes > 0 and cost <= math.log(nodes)
+        return True
+
+    def solve(self, board):
+        """Solve a position exactly, i.e. search it until the end of the
+        game.
+
+        Positions are scored by their result and by the distance to it, as
+        in the :mod:`tablebase <connect4.tablebase>`: the fastest win (or
+        slowest loss) is played. Immediate wins are looked for before
+        anything else is searched. Scores are cached in
+        :attr:`endgame_cache`.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The current board.
+
+        Returns:
+            (Node): The root node, with its column to play set. Its score is
+            ``0`` for a draw, else the score of a win (or loss) in as many
+            plies as the best play takes, like the scores of :meth:`minimax`.
+        Raises:
+            SearchTimeout: if the deadline of the search is reached.
+        """
+
+        zobrist = self.zobrist_for(board)
+        key = zobrist.key(board)
+        empty = board.n_rows * board.n_cols - sum(1 for _ in board.occupied())
+        cols = self.solve_columns(board)
+
+        best, best_col = None, None
+        for col in cols:
+            row = board.insert(col, self.coin)
+            won = board.connects(row, col, self.to_win)
+            board.remove(col)
+            if won:
+                best, best_col = empty, col
+                break
+
+        if best is None:
+            best = -empty - 1
+            for col in cols:
+                row = board.insert(col, self.coin)
+                try:
+                    value = -self._solve(
+                        board, zobrist, zobrist.move(key, row, col, self.coin),
+                        self.opponent.coin, self.coin, -empty, -best,
+                        empty - 1)
+                finally:
+                    board.remove(col)
+                if value > best:
+                    best, best_col = value, col
+
+        # A value of n is a win whose last move is played with n empty
+        # cells left, i.e. after empty - n + 1 plies.
+        if best > 0:
+            score = self.WIN - (empty - best + 1)
+        elif best < 0:
+            score = -self.WIN + (empty + best + 1)
+        else:
+            score = 0
+        return Node(board=board,
+                    player=self,
+                    col_played=None,
+                    col_to_play=best_col,
+                    score=score,
+                    childs=[])
+
+    def _solve(self, board, zobrist, key, coin, other, alpha, beta, empty):
+        """Return the value of a position for the player to move, in negamax
+        form: ``0`` for a draw, ``n`` (or ``-n``) for a win (or loss) whose
+        last move is played with ``n`` empty cells left, so that faster wins
+        are worth more. ``key`` includes the player to move."""
+
+        self.n_nodes += 1
+        if self._deadline is not None and time.time() > self._deadline:
+            raise SearchTimeout()
+
+        cols = self.solve_columns(board)
+        if not cols:
+            return 0
+
+        for col in cols:
+            row = board.insert(col, coin)
+            won = board.connects(row, col, self.to_win)
+            board.remove(col)
+            if won:
+                return empty
+
+        # Without an immediate win, the player to move wins at best with its
+        # next move, two cells later.
+        beta = min(beta, max(empty - 2, 0))
+        if alpha >= beta:
+            return beta
+
+        # Entries pack the value and the bound in a single integer.
+        entry = self.endgame_cache.get(key)
+        if entry is not None:
+            value, bound = entry >> 2, entry & 3
+            if bound == TranspositionTable.EXACT:
+                return value
+            elif bound == TranspositionTable.LOWER:
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        alpha_orig = alpha
+        best = -empty
+        for col in cols:
+            row = board.insert(col, coin)
+            try:
+                value = -self._solve(board, zobrist,
+                                     zobrist.move(key, row, col, coin),
+                                     other, coin, -beta, -alpha, empty - 1)
+            finally:
+                board.remove(col)
+
+            if value > best:
+                best = value
+                alpha = max(alpha, best)
+                if alpha >= beta:
+                    break
+
+        if best <= alpha_orig:
+            bound = TranspositionTable.UPPER
+        elif best >= beta:
+            bound = TranspositionTable.LOWER
+        else:
+            bound = TranspositionTable.EXACT
+        self.endgame_cache.put(key, best << 2 | bound)
+
+        return best
+
+    def solve_columns(self, board):
+        """Return the free columns of a board, central columns first.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The board.
+
+        Returns:
+            (list): The free columns.
+        """
+
+        center = (board.n_cols - 1) / 2
+        return sorted(board.free_columns(), key=lambda col: abs(col - center))
+
+    def reset(self):
+        """Forget the search state of the previous game. The evaluation cache
+        is kept."""
+
+        if self.tt is not None:
+            self.tt.clear()
+        self.pv = []
+        self.history = {}
+        self._observed = []
+        self._max_search_nodes = 0
+
+    def observe(self, col, coin):
+        """Record a move, so that the search state can be re-rooted on the
+        actual line of play.
+
+        Args:
+            col(int): The column that was played.
+            coin(str): The coin that was inserted.
+        """
+
+        self._observed.append(col)
+
+    def reroot(self):
+        """Move the search state to the current position, using the moves
+        observed since the last search.
+
+        Entries of the transposition table are indexed by position so they
+        remain valid. The principal variation is kept if the moves that were
+        actually played follow it, and the history scores are aged so that
+        recent cutoffs weigh more.
+        """
+
+        n = len(self._observed)
+        if self.pv[:n] == self._observed:
+            self.pv = self.pv[n:]
+        else:
+            self.pv = []
+        if n:
+            self.history = dict((move, score // 2)
+                                for move, score in self.history.items()
+                                if score > 1)
+        self._observed = []
+
+    def principal_variation(self, board):
+        """Extract the principal variation of the last search from the
+        transposition table.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The board the last
+                search was run on.
+
+        Returns:
+            (list): The columns of the principal variation.
+        """
+
+        pv = []
+        if self.tt is None:
+            return pv
+
+        key = self.zobrist.key(board)
+        coins = (self.coin, self.opponent.coin)
+        for ply in range(self.depth):
+            entry = self.tt.probe(key)
+            if entry is None or entry[3] is None or \
+               not board.is_free(entry[3]):
+                break
+            col, coin = entry[3], coins[ply % 2]
+            row = board.insert(col, coin)
+            key = self.zobrist.move(key, row, col, coin)
+            pv.append(col)
+            if board.winning_coin(self.to_win) is not None:
+                break
+
+        for col in reversed(pv):
+            board.remove(col)
+
+        return pv
+
+    def aspiration_search(self, node):
+        """Search a node with iterative deepening and aspiration windows.
+
+        Each iteration is first searched with a narrow window around the
+        score of the previous iteration. If the score falls outside of the
+        window, the search is run again with the window opened on that side.
+
+        Args:
+            node(Node): The root node.
+        Raises:
+            SearchTimeout: if the deadline of the search is reached. The node
+                is then left with the result of the last completed iteration,
+                not with the one of an interrupted (re-)search.
+        """
+
+        for depth in range(1, self.depth + 1):
+            if node.score is None or abs(node.score) >= self.WIN_THRESHOLD:
+                alpha, beta = -self.INF, self.INF
+            else:
+                alpha = node.score - self.aspiration
+                beta = node.score + self.aspiration
+
+            completed = node.score, node.col_to_play
+            try:
+                while True:
+                    self.minimax(node, depth, alpha, beta)
+                    if node.score <= alpha != -self.INF:
+                        alpha = -self.INF
+                    elif node.score >= beta != self.INF:
+                        beta = self.INF
+                    else:
+                        break
+            except SearchTimeout:
+                node.score, node.col_to_play = completed
+                raise
+
+    def __getstate__(self):
+
+        # Pickled players (e.g. Lazy SMP workers) only need the coin of their
+        # opponent, and the Zobrist keys are rebuilt by root_node.
+        state = self.__dict__.copy()
+        if self.opponent is not None:
+            state['opponent'] = Player(self.opponent.coin)
+        state['zobrist'] = None
+        return state
+
+    def close(self):
+        """Release the resources held by the player, such as the shared
+        memory of the transposition table or the file of the store."""
+
+        if hasattr(self.tt, 'close'):
+            self.tt.close()
+        self.tt = None
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
 
 class Node:
     """A node class for the minimax algorithm graph search.
@@ -282,10 +1063,13 @@ class Node:
             outcome.
         score(int): The score of the current game state.
         childs(list): The child nodes.
+        key(int, optional): The Zobrist key of the board, only needed when a
+            transposition table or an evaluation cache is used.
+        ply(int, optional): The distance to the root node. Default is ``0``.
     """
 
     def __init__(self, board, player, col_played, col_to_play, score,
-                 childs):
+                 childs, key=None, ply=0):
 
         self.board = board
         self.player = player
@@ -293,6 +1077,8 @@ class Node:
         self.col_played = col_played
         self.score = score
         self.childs = childs
+        self.key = key
+        self.ply = ply
 
     def __str__(self):
 
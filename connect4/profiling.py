@@ -0,0 +1,241 @@
+"""
+This module contains profiling helpers for the engine and the command line
+tools.
+
+Two tools are available:
+
+- :func:`profile` runs a function under ``cProfile``, prints the hottest
+  functions and optionally saves the raw statistics to a file that can be
+  loaded with :mod:`pstats` (or any viewer like ``snakeviz``).
+- Timing hooks measure the time spent in move generation, evaluation and win
+  checks. They are installed by :func:`enable_timing`, which wraps the
+  relevant methods, and removed by :func:`disable_timing`, which puts the
+  original methods back: when disabled, they cost nothing at all.
+
+The command line tools (``python -m connect4``, ``python -m connect4.store``,
+...) expose both through their ``-profile`` and ``-timings`` options.
+
+Example::
+
+    $ python -m connect4 -player1 minimax -profile game.prof -timings
+    $ python -c "import pstats; pstats.Stats('game.prof').print_callers()"
+
+Hooks only measure the current process: the workers of a parallel search are
+not included.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import cProfile
+import functools
+import pstats
+import sys
+from contextlib import contextmanager
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter  # Python 2
+
+from .game import BaseBoard
+from .game import CompactBoard
+from .game import SparseBoard
+from .player import Minimax
+
+
+# The methods wrapped by each timing hook, as (class, method name) pairs.
+# Times are inclusive: e.g. the win checks made by an evaluation are counted
+# in both hooks.
+HOOKS = {
+    'moves': ((Minimax, 'ordered_columns'),
+              (BaseBoard, 'candidate_columns'),
+              (SparseBoard, 'candidate_columns')),
+    'evaluation': ((Minimax, 'utility'),),
+    'win_check': ((BaseBoard, 'winning_coin'),
+                  (BaseBoard, 'connects'),
+                  (CompactBoard, 'connects'),
+                  (SparseBoard, 'winning_coin'),
+                  (SparseBoard, 'connects')),
+}
+
+
+class Timings(object):
+    """The number of calls and the total time of each timing hook.
+
+    Attributes:
+        calls(dict): The number of calls of each hook.
+        seconds(dict): The total time spent in each hook, in seconds.
+    """
+
+    def __init__(self):
+
+        self.clear()
+
+    def clear(self):
+        """Reset all the counters."""
+
+        self.calls = {}
+        self.seconds = {}
+
+    def add(self, hook, seconds):
+        """Record a call of a hook.
+
+        Args:
+            hook(str): The hook.
+            seconds(float): The duration of the call.
+        """
+
+        self.calls[hook] = self.calls.get(hook, 0) + 1
+        self.seconds[hook] = self.seconds.get(hook, 0) + seconds
+
+    def report(self):
+        """Return the counters as a table, slowest hook first.
+
+        Returns:
+            (str): The table.
+        """
+
+        lines = ['{0:>12s} {1:>10s} {2:>10s} {3:>10s}'.format(
+                 'hook', 'calls', 'seconds', 'us/call')]
+        for hook in sorted(self.calls, key=lambda h: -self.seconds[h]):
+            lines.append('{0:>12s} {1:10d} {2:10.3f} {3:10.1f}'.format(
+                         hook, self.calls[hook], self.seconds[hook],
+                         1e6 * self.seconds[hook] / self.calls[hook]))
+        return '\n'.join(lines)
+
+
+timings = Timings()
+_originals = {}  # (class, method name) -> original method
+
+
+def _timed(hook, func):
+    """Wrap ``func`` so that its calls are recorded in :data:`timings`."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.add(hook, perf_counter() - start)
+
+    return wrapper
+
+
+def enable_timing(hooks=None):
+    """Install timing hooks. Calling it again has no effect on the hooks that
+    are already installed.
+
+    Args:
+        hooks(iterable of str, optional): The hooks to install, among the
+            keys of :data:`HOOKS`. Default is to install all of them.
+
+    Returns:
+        (:class:`Timings`): The counters of the hooks.
+    """
+
+    for hook in (HOOKS if hooks is None else hooks):
+        for cls, name in HOOKS[hook]:
+            if (cls, name) not in _originals:
+                _originals[cls, name] = cls.__dict__[name]
+                setattr(cls, name, _timed(hook, cls.__dict__[name]))
+
+    return timings
+
+
+def disable_timing():
+    """Remove all the timing hooks. The counters are kept."""
+
+    for (cls, name), method in _originals.items():
+        setattr(cls, name, method)
+    _originals.clear()
+
+
+@contextmanager
+def timing(hooks=None):
+    """A context manager that installs timing hooks on entry (see
+    :func:`enable_timing`) and removes them on exit."""
+
+    try:
+        yield enable_timing(hooks)
+    finally:
+        disable_timing()
+
+
+def profile(func, args=(), kwargs=None, path=None, sort='cumulative',
+            limit=25, stream=None):
+    """Call a function under ``cProfile`` and print its hottest functions.
+
+    Args:
+        func(callable): The function to profile.
+        args(tuple): The positional arguments of ``func``.
+        kwargs(dict, optional): The keyword arguments of ``func``.
+        path(str, optional): If given, the statistics are also saved to this
+            file, in the :mod:`pstats` format.
+        sort(str): The sort key of the report, see
+            ``pstats.Stats.sort_stats``. Default is ``'cumulative'``.
+        limit(int): The number of functions in the report. Default is
+            ``25``.
+        stream(file, optional): Where to print the report. Default is
+            ``sys.stdout``.
+
+    Returns:
+        The return value of ``func``.
+    """
+
+    profiler = cProfile.Profile()
+    try:
+        result = profiler.runcall(func, *args, **(kwargs or {}))
+    finally:
+        if path is not None:
+            profiler.dump_stats(path)
+        stats = pstats.Stats(profiler, stream=stream or sys.stdout)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+    return result
+
+
+def add_arguments(parser):
+    """Add the ``-profile`` and ``-timings`` options to a command line
+    parser. The parsed arguments are used by :func:`run`.
+
+    Args:
+        parser(argparse.ArgumentParser): The parser.
+    """
+
+    parser.add_argument('-profile', '--profile', metavar='PATH',
+                        default=None,
+                        help='Run under cProfile, print the hottest ' +
+                        'functions and save the statistics to PATH.')
+    parser.add_argument('-timings', '--timings', action='store_true',
+                        help='Print the time spent in move generation, ' +
+                        'evaluation and win checks.')
+
+
+def run(args, func, *func_args, **func_kwargs):
+    """Call a function with the profiling requested on the command line.
+
+    Args:
+        args(argparse.Namespace): The parsed arguments of a parser set up by
+            :func:`add_arguments`.
+        func(callable): The function to call.
+        func_args: The positional arguments of ``func``.
+        func_kwargs: The keyword arguments of ``func``.
+
+    Returns:
+        The return value of ``func``.
+    """
+
+    if args.timings:
+        timings.clear()
+        enable_timing()
+    try:
+        if args.profile is not None:
+            result = profile(func, func_args, func_kwargs, path=args.profile)
+        else:
+            result = func(*func_args, **func_kwargs)
+    finally:
+        if args.timings:
+            disable_timing()
+            print(timings.report())
+
+    return result
@@ -0,0 +1,434 @@
+"""
+This module contains an incremental rating engine for tournaments.
+
+Game results are consumed one at a time, and each result only updates the
+ratings of its two players, so that rating a long stream of games never
+requires going through the history again. Two rating systems are available:
+
+- ``'elo'``: the usual Elo system with a constant ``K`` factor. The
+  confidence interval of a rating is derived from the Fisher information
+  accumulated over the player's games.
+- ``'glicko'``: the Glicko system, each game being its own rating period.
+  Each player has a rating deviation (RD) that shrinks as games are played
+  and the confidence interval is ``rating +/- z * RD``.
+
+The state is saved to (and loaded from) a small JSON checkpoint, so a
+tournament can be rated incrementally across runs. The checkpoint records how
+many lines of each file of results were rated, so only the games appended
+since the previous run are rated.
+
+Example::
+
+    $ python -m connect4.rating results.txt -checkpoint ratings.json
+
+where each line of ``results.txt`` is ``player1 player2 score``, ``score``
+being the score of ``player1``: ``1``, ``0.5`` or ``0`` (``1-0``,
+``1/2-1/2`` and ``0-1`` are accepted too).
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import io
+import json
+import math
+import os
+from itertools import islice
+try:
+    from inspect import getfullargspec as getargspec
+except ImportError:
+    from inspect import getargspec  # Python 2
+
+from . import profiling
+
+
+Q = math.log(10) / 400
+
+# The score of player1 for each written result.
+SCORES = {'1': 1., '1-0': 1., '0.5': .5, '1/2': .5, '1/2-1/2': .5,
+          '0': 0., '0-1': 0.}
+
+
+class Rating(object):
+    """The rating of a player.
+
+    Attributes:
+        rating(float): The rating.
+        rd(float): The rating deviation (Glicko only).
+        info(float): The Fisher information of the rating (Elo only).
+        wins(int): The number of won games.
+        draws(int): The number of drawn games.
+        losses(int): The number of lost games.
+    """
+
+    __slots__ = ('rating', 'rd', 'info', 'wins', 'draws', 'losses')
+
+    def __init__(self, rating, rd, info=0., wins=0, draws=0, losses=0):
+
+        self.rating = rating
+        self.rd = rd
+        self.info = info
+        self.wins = wins
+        self.draws = draws
+        self.losses = losses
+
+    @property
+    def games(self):
+        """The number of games played."""
+
+        return self.wins + self.draws + self.losses
+
+    def to_list(self):
+
+        return [self.rating, self.rd, self.info, self.wins, self.draws,
+                self.losses]
+
+
+def player_name(player):
+    """Return the name of a player in the standings: its ``name`` attribute
+    if it has one, else its class, its search depth (if any) and the
+    settings it was built with that differ from the defaults, e.g.
+    ``'Minimax(depth=5)'`` or ``'Minimax(depth=5, algorithm=pvs)'``."""
+
+    name = getattr(player, 'name', None)
+    if name:
+        return name
+
+    settings = []
+    if hasattr(player, 'depth'):
+        settings.append('depth={0}'.format(player.depth))
+    spec = getargspec(type(player).__init__)
+    defaults = spec.defaults or ()
+    for arg, default in zip(spec.args[len(spec.args) - len(defaults):],
+                            defaults):
+        value = getattr(player, arg, default)
+        if (arg not in ('depth', 'verbose') and value != default and
+                isinstance(value, (int, float, str, bool))):
+            settings.append('{0}={1}'.format(arg, value))
+
+    name = type(player).__name__
+    if settings:
+        name += '({0})'.format(', '.join(settings))
+    return name
+
+
+class Ratings(object):
+    """Incrementally updated ratings of a pool of players.
+
+    Args:
+        system(str): ``'elo'`` or ``'glicko'``. Default is ``'glicko'``.
+        initial(float): The rating of new players. Default is ``1500``.
+        k(float): The K factor of the Elo system. Default is ``16``.
+        initial_rd(float): The rating deviation of new players (Glicko
+            only). Default is ``350``.
+        c(float): The increase of the rating deviations before each game,
+            which lets ratings follow players whose strength changes over
+            time (Glicko only). Default is ``0``.
+
+    Attributes:
+        players(dict): The :class:`Rating` of each player, by name.
+        n_games(int): The number of games rated so far.
+        sources(dict): The number of lines already rated by
+            :meth:`update_file`, by absolute path of the file.
+    """
+
+    SYSTEMS = ('elo', 'glicko')
+
+    def __init__(self, system='glicko', initial=1500., k=16.,
+                 initial_rd=350., c=0.):
+
+        if system not in self.SYSTEMS:
+            raise ValueError('Unknown rating system ' + str(system) + '.')
+
+        self.system = system
+        self.initial = initial
+        self.k = k
+        self.initial_rd = initial_rd
+        self.c = c
+        self.players = {}
+        self.n_games = 0
+        self.sources = {}
+
+    def _get(self, name):
+
+        if name not in self.players:
+            self.players[name] = Rating(self.initial, self.initial_rd)
+        return self.players[name]
+
+    def update(self, name1, name2, score):
+        """Rate a game.
+
+        Args:
+            name1(str): The first player.
+            name2(str): The second player.
+            score(float): The score of the first player: ``1`` for a win,
+                ``.5`` for a draw and ``0`` for a loss.
+        Raises:
+            ValueError: if both players have the same name.
+        """
+
+        if name1 == name2:
+            raise ValueError('Both players are named ' + name1 + '.')
+
+        p1, p2 = self._get(name1), self._get(name2)
+        if self.system == 'elo':
+            e = 1 / (1 + 10**((p2.rating - p1.rating) / 400))
+            p1.rating, p2.rating = (p1.rating + self.k * (score - e),
+                                    p2.rating - self.k * (score - e))
+            p1.info += Q**2 * e * (1 - e)
+            p2.info += Q**2 * e * (1 - e)
+        else:
+            for p in (p1, p2):
+                p.rd = min(math.sqrt(p.rd**2 + self.c**2), self.initial_rd)
+            (p1.rating, p1.rd), (p2.rating, p2.rd) = (
+                self._glicko(p1, p2, score), self._glicko(p2, p1, 1 - score))
+
+        for p, s in ((p1, score), (p2, 1 - score)):
+            if s == 1:
+                p.wins += 1
+            elif s == 0:
+                p.losses += 1
+            else:
+                p.draws += 1
+        self.n_games += 1
+
+    @staticmethod
+    def _glicko(p, opponent, score):
+        """Return the new ``(rating, rd)`` of ``p`` after a game against
+        ``opponent``."""
+
+        g = 1 / math.sqrt(1 + 3 * Q**2 * opponent.rd**2 / math.pi**2)
+        e = 1 / (1 + 10**(-g * (p.rating - opponent.rating) / 400))
+        d2_inv = Q**2 * g**2 * e * (1 - e)
+        denominator = 1 / p.rd**2 + d2_inv
+        return (p.rating + Q / denominator * g * (score - e),
+                math.sqrt(1 / denominator))
+
+    def update_all(self, results):
+        """Rate a stream of games.
+
+        Args:
+            results(iterable): The ``(name1, name2, score)`` triplets of the
+                games (see :meth:`update`).
+        """
+
+        for name1, name2, score in results:
+            self.update(name1, name2, score)
+
+    def update_file(self, path):
+        """Rate the games of a file of results that weren't rated yet.
+
+        The lines already consumed are counted in :attr:`sources` (which is
+        saved in checkpoints), so a file that games are appended to can be
+        rated again and again: each game is only rated once. A last line
+        without a newline may still be being written, it is left for later.
+
+        Args:
+            path(str): The file, one ``player1 player2 score`` game per line
+                (see :func:`parse_results`).
+        Raises:
+            ValueError: if a line isn't a valid result.
+        """
+
+        source = os.path.abspath(path)
+        n_lines = self.sources.get(source, 0)
+        with io.open(path, encoding='utf-8') as f:
+            for line in islice(f, n_lines, None):
+                if not line.endswith('\n'):
+                    break
+                self.update_all(parse_results([line]))
+                n_lines += 1
+                self.sources[source] = n_lines
+
+    def update_game(self, game, names=None):
+        """Rate a game that was run with :meth:`Game.run
+        <connect4.game.Game.run>`.
+
+        Args:
+            game(:class:`Game <connect4.game.Game>`): The game.
+            names(dict, optional): The name of each player. Default is to
+                use :func:`player_name`.
+        Raises:
+            ValueError: if both players get the same name, e.g. two
+                identical :class:`Minimax <connect4.player.Minimax>` players
+                with no ``names``.
+        """
+
+        names = names or {}
+        name1 = names.get(game.player1) or player_name(game.player1)
+        name2 = names.get(game.player2) or player_name(game.player2)
+        if game.winner is None:
+            score = .5
+        else:
+            score = 1. if game.winner is game.player1 else 0.
+        self.update(name1, name2, score)
+
+    def interval(self, name, z=1.96):
+        """Return the confidence interval of a rating.
+
+        Args:
+            name(str): The player.
+            z(float): The number of standard deviations of the interval.
+                Default is ``1.96``, i.e. a 95% interval.
+
+        Returns:
+            (tuple): The lower and upper bounds of the interval. They are
+            infinite for an Elo rating with no game.
+        """
+
+        p = self.players[name]
+        if self.system == 'elo':
+            sd = 1 / math.sqrt(p.info) if p.info else float('inf')
+        else:
+            sd = p.rd
+        return p.rating - z * sd, p.rating + z * sd
+
+    def standings(self, z=1.96):
+        """Return the players sorted by decreasing rating.
+
+        Args:
+            z(float): The number of standard deviations of the confidence
+                intervals. Default is ``1.96``.
+
+        Returns:
+            (list of dict): For each player, its ``'name'``, ``'rating'``,
+            confidence ``'interval'``, and number of ``'games'``,
+            ``'wins'``, ``'draws'`` and ``'losses'``.
+        """
+
+        rows = []
+        for name, p in self.players.items():
+            rows.append({'name': name, 'rating': p.rating,
+                         'interval': self.interval(name, z),
+                         'games': p.games, 'wins': p.wins,
+                         'draws': p.draws, 'losses': p.losses})
+        return sorted(rows, key=lambda row: (-row['rating'], row['name']))
+
+    def table(self, z=1.96):
+        """Return the standings as a table.
+
+        Args:
+            z(float): The number of standard deviations of the confidence
+                intervals. Default is ``1.96``.
+
+        Returns:
+            (str): The table.
+        """
+
+        lines = ['{0:>4s} {1:20s} {2:>7s} {3:>15s} {4:>6s} {5:>14s}'.format(
+                 'rank', 'player', 'rating', 'interval', 'games', 'W-D-L')]
+        for rank, row in enumerate(self.standings(z), 1):
+            lines.append(
+                '{0:4d} {1:20s} {2:7.0f} {3:>15s} {4:6d} {5:>14s}'.format(
+                    rank, row['name'], row['rating'],
+                    '{0:.0f}..{1:.0f}'.format(*row['interval']), row['games'],
+                    '{0}-{1}-{2}'.format(row['wins'], row['draws'],
+                                         row['losses'])))
+        return '\n'.join(lines)
+
+    def save(self, path):
+        """Save the ratings to a checkpoint file. The file is replaced
+        atomically.
+
+        Args:
+            path(str): The path of the file.
+        """
+
+        state = {'system': self.system, 'initial': self.initial,
+                 'k': self.k, 'initial_rd': self.initial_rd, 'c': self.c,
+                 'n_games': self.n_games, 'sources': self.sources,
+                 'players': dict((name, p.to_list())
+                                 for name, p in self.players.items())}
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        with io.open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(state, separators=(',', ':'), sort_keys=True))
+        os.rename(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load ratings from a checkpoint file written by :meth:`save`.
+
+        Args:
+            path(str): The path of the file.
+
+        Returns:
+            (:class:`Ratings`): The ratings.
+        """
+
+        with io.open(path, encoding='utf-8') as f:
+            state = json.loads(f.read())
+        ratings = cls(state['system'], initial=state['initial'],
+                      k=state['k'], initial_rd=state['initial_rd'],
+                      c=state['c'])
+        ratings.n_games = state['n_games']
+        ratings.sources = state.get('sources', {})
+        ratings.players = dict((name, Rating(*values))
+                               for name, values in state['players'].items())
+        return ratings
+
+
+def parse_results(lines):
+    """Generator function to parse game results.
+
+    Args:
+        lines(iterable of str): The results, one ``player1 player2 score``
+            game per line. Empty lines and lines starting with ``#`` are
+            ignored.
+
+    Returns:
+        The ``(name1, name2, score)`` triplet of each game.
+    Raises:
+        ValueError: if a line isn't a valid result.
+    """
+
+    for line in lines:
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        try:
+            name1, name2, score = line.split()
+            yield name1, name2, SCORES[score]
+        except (ValueError, KeyError):
+            raise ValueError('Invalid result: ' + line.strip())
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+             description='Rate the players of a tournament.',
+             epilog='Example: python -m connect4.rating results.txt ' +
+                    '-checkpoint ratings.json')
+
+    parser.add_argument('paths', type=str, nargs='*',
+                        help='The files of results, one ' +
+                        '"player1 player2 score" game per line.')
+    parser.add_argument('-checkpoint', type=str, default=None,
+                        help='The ratings are loaded from this file if it ' +
+                        'exists, and saved to it. (default: none)')
+    parser.add_argument('-system', type=str, default='glicko',
+                        choices=Ratings.SYSTEMS,
+                        help='The rating system of new checkpoints. ' +
+                        '(default: glicko)')
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    if args.checkpoint is not None and os.path.exists(args.checkpoint):
+        ratings = Ratings.load(args.checkpoint)
+    else:
+        ratings = Ratings(args.system)
+
+    def run():
+
+        for path in args.paths:
+            ratings.update_file(path)
+
+    try:
+        profiling.run(args, run)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.checkpoint is not None:
+        ratings.save(args.checkpoint)
+    print(ratings.table())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+This module contains a fast replay engine for recorded games.
+
+A game is recorded as the sequence of its columns, one game per line. With
+the usual notation, columns start from ``1`` and are written without
+separators (``4453...``); for boards with more than 9 columns, columns are
+separated by commas or spaces. Empty lines and lines starting with ``#`` are
+ignored.
+
+Games are replayed on a :class:`CompactBoard <connect4.game.CompactBoard>`,
+checking only the last inserted coin for a win. Each game is validated (every
+move must be legal, and no move may follow the end of the game) and its
+result and length are computed. Optionally, each position can also be
+evaluated with :meth:`Minimax.utility <connect4.player.Minimax.utility>` or
+with a search.
+
+Example::
+
+    $ python -m connect4.replay games/*.txt -processes 4 -evaluate search
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import io
+import multiprocessing
+from itertools import islice
+
+from . import profiling
+from .game import CompactBoard
+from .player import Minimax
+
+
+EVALUATIONS = ('utility', 'search')
+
+
+def parse_moves(line):
+    """Parse a recorded game.
+
+    Args:
+        line(str): The columns of the game, starting from ``1``, either
+            without separators or separated by commas or spaces.
+
+    Returns:
+        (tuple of int): The columns, starting from ``0``.
+    Raises:
+        ValueError: if ``line`` isn't a valid game record.
+    """
+
+    line = line.strip()
+    if ',' in line or ' ' in line:
+        cols = line.replace(',', ' ').split()
+    else:
+        cols = line
+    return tuple(int(col) - 1 for col in cols)
+
+
+class Replayer(object):
+    """Replay games on boards of a given geometry.
+
+    Args:
+        n_rows(int): The number of rows of the board. Default is ``6``.
+        n_cols(int): The number of columns of the board. Default is ``7``.
+        to_win(int): The number of aligned coins needed to win. Default is
+            ``4``.
+        coins(tuple of str): The coins of the two players, the first one
+            playing first. Default is ``('X', 'O')``.
+        evaluate(str, optional): How to evaluate the positions: ``'utility'``
+            for :meth:`Minimax.utility
+            <connect4.player.Minimax.utility>`, ``'search'`` for a search at
+            ``depth``. Default is ``None``, i.e. no evaluation.
+        depth(int): The depth of the searches. Default is ``4``.
+    """
+
+    def __init__(self, n_rows=6, n_cols=7, to_win=4, coins=('X', 'O'),
+                 evaluate=None, depth=4):
+
+        if evaluate is not None and evaluate not in EVALUATIONS:
+            raise ValueError('Unknown evaluation ' + str(evaluate) + '.')
+
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.to_win = to_win
+        self.coins = tuple(coins)
+        self.evaluate = evaluate
+        self.depth = depth
+
+        # The evaluators of each coin.
+        self.players = {}
+        if evaluate is not None:
+            player1 = Minimax(coins[0], depth=depth, reuse_state=False)
+            player2 = Minimax(coins[1], depth=depth, reuse_state=False)
+            player1.opponent, player2.opponent = player2, player1
+            player1.to_win = player2.to_win = to_win
+            self.players = {coins[0]: player1, coins[1]: player2}
+
+    def replay(self, moves):
+        """Replay a game.
+
+        Args:
+            moves(iterable of int): The columns played, starting from ``0``.
+
+        Returns:
+            (dict): The ``'moves'`` of the game (a tuple), its ``'result'``
+            (``'win'``, ``'draw'``, ``'unfinished'`` or ``'illegal'``), the
+            ``'winner'`` coin (or ``None``), the ``'ply'`` at which the game
+            ended or at which the first illegal move was played (starting from
+            ``1``, ``None`` for unfinished games), the ``'error'`` message of
+            illegal games (or ``None``) and the ``'evaluations'``.
+            ``evaluations[i]`` is the ``(score, col)`` evaluation of the
+            position before the ``i``-th move, from the point of view of the
+            player to move. ``col`` is the best column found by the search, or
+            ``None`` for a ``'utility'`` evaluation. ``'evaluations'`` is
+            ``None`` if the replayer doesn't evaluate positions.
+        """
+
+        moves = tuple(moves)
+        board = CompactBoard(self.n_rows, self.n_cols)
+        n_cells = self.n_rows * self.n_cols
+        result = {'moves': moves, 'result': 'unfinished', 'winner': None,
+                  'ply': None, 'error': None,
+                  'evaluations': [] if self.evaluate else None}
+
+        for ply, col in enumerate(moves, 1):
+            if result['ply'] is not None:
+                result.update(result='illegal', winner=None, ply=ply,
+                              error='Move after the end of the game.')
+                break
+            if not 0 <= col < self.n_cols or not board.is_free(col):
+                result.update(result='illegal', ply=ply,
+                              error='Column {0} is not playable.'.format(
+                                    col + 1))
+                break
+
+            coin = self.coins[(ply - 1) % 2]
+            if self.evaluate is not None:
+                result['evaluations'].append(self._evaluate(board, coin))
+            row = board.insert(col, coin)
+            if board.connects(row, col, self.to_win):
+                result.update(result='win', winner=coin, ply=ply)
+            elif ply == n_cells:
+                result.update(result='draw', ply=ply)
+
+        return result
+
+    def _evaluate(self, board, coin):
+        """Return the ``(score, col)`` evaluation of a position for the player
+        to move."""
+
+        player = self.players[coin]
+        if self.evaluate == 'utility':
+            return player.utility(board), None
+        node = player.root_node(board)
+        player.minimax(node, self.depth, -player.INF, player.INF)
+        return node.score, node.col_to_play
+
+
+def replay_lines(lines, replayer, source=None, start=1):
+    """Generator function to replay the games of some lines.
+
+    Args:
+        lines(iterable of str): The recorded games.
+        replayer(:class:`Replayer`): The replayer.
+        source(str, optional): The name of the file of the lines.
+        start(int): The number of the first line. Default is ``1``.
+
+    Returns:
+        The result of each game (see :meth:`Replayer.replay`), with the
+        ``'source'`` and ``'line'`` of the game. Lines that can't be parsed
+        are ``'illegal'`` games with no moves.
+    """
+
+    for number, line in enumerate(lines, start):
+        if not line.strip() or line.lstrip().startswith('#'):
+            continue
+        try:
+            moves = parse_moves(line)
+        except ValueError:
+            result = {'moves': (), 'result': 'illegal', 'winner': None,
+                      'ply': None, 'error': 'Invalid record.',
+                      'evaluations': None}
+        else:
+            result = replayer.replay(moves)
+        result.update(source=source, line=number)
+        yield result
+
+
+def _chunks(paths, chunk_size):
+    """Generator function to split files into ``(path, start, lines)``
+    chunks of ``chunk_size`` lines."""
+
+    for path in paths:
+        with io.open(path, encoding='utf-8') as f:
+            start = 1
+            while True:
+                lines = list(islice(f, chunk_size))
+                if not lines:
+                    break
+                yield path, start, lines
+                start += len(lines)
+
+
+def _replay_chunk(args):
+    """Replay a chunk of lines in a worker process."""
+
+    replayer, (path, start, lines) = args
+    return list(replay_lines(lines, replayer, source=path, start=start))
+
+
+def replay_files(paths, replayer=None, processes=1, chunk_size=1000):
+    """Generator function to replay the games of some files.
+
+    Args:
+        paths(iterable of str): The files.
+        replayer(:class:`Replayer`, optional): The replayer. Default is a
+            replayer for the standard 6x7 board, without evaluation.
+        processes(int): The number of worker processes. Files are split into
+            chunks of ``chunk_size`` lines, which are replayed in parallel.
+            If ``1``, games are replayed in the current process. Default is
+            ``1``.
+        chunk_size(int): The number of lines of a chunk. Default is
+            ``1000``.
+
+    Returns:
+        The result of each game (see :func:`replay_lines`), in the order of
+        the files.
+    """
+
+    replayer = Replayer() if replayer is None else replayer
+
+    if processes == 1:
+        for path in paths:
+            with io.open(path, encoding='utf-8') as f:
+                for result in replay_lines(f, replayer, source=path):
+                    yield result
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        tasks = ((replayer, chunk) for chunk in _chunks(paths, chunk_size))
+        for results in pool.imap(_replay_chunk, tasks):
+            for result in results:
+                yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+             description='Replay and validate recorded games.',
+             epilog='Example: python -m connect4.replay games.txt ' +
+                    '-processes 4 -evaluate search')
+
+    parser.add_argument('paths', type=str, nargs='+',
+                        help='The files of recorded games, one game per line.')
+    parser.add_argument('-rows', type=int, default=6,
+                        help='The number of rows. (default: 6)')
+    parser.add_argument('-cols', type=int, default=7,
+                        help='The number of columns. (default: 7)')
+    parser.add_argument('-to-win', type=int, default=4,
+                        help='The number of aligned coins needed to win. ' +
+                        '(default: 4)')
+    parser.add_argument('-evaluate', type=str, default=None,
+                        choices=EVALUATIONS,
+                        help='Evaluate each position. (default: none)')
+    parser.add_argument('-depth', type=int, default=4,
+                        help='The depth of the searches. (default: 4)')
+    parser.add_argument('-processes', type=int, default=1,
+                        help='The number of worker processes. (default: 1)')
+    parser.add_argument('-quiet', action='store_true',
+                        help='Only print the totals.')
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    replayer = Replayer(args.rows, args.cols, args.to_win,
+                        evaluate=args.evaluate, depth=args.depth)
+
+    def run():
+
+        totals = {}
+        for r in replay_files(args.paths, replayer,
+                              processes=args.processes):
+            totals[r['result']] = totals.get(r['result'], 0) + 1
+            if args.quiet:
+                continue
+            line = '{0}:{1}\t{2}\t{3}\t{4}'.format(
+                   r['source'], r['line'], r['result'], r['winner'] or '-',
+                   r['ply'] or '-')
+            if r['error']:
+                line += '\t' + r['error']
+            if r['evaluations']:
+                line += '\t' + ' '.join(str(score)
+                                        for score, _ in r['evaluations'])
+            print(line)
+        print(', '.join('{0} {1}'.format(n, result)
+                        for result, n in sorted(totals.items())))
+
+    profiling.run(args, run)
+
+
+if __name__ == "__main__":
+    main()
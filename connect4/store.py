@@ -0,0 +1,323 @@
+"""
+This module contains a persistent store of search results, shared by all the
+processes that open the same file.
+
+The store is a memory-mapped open-addressing hash table: the file starts with
+a small header, followed by a fixed number of slots laid out exactly as those
+of a :class:`TranspositionTable <connect4.transposition.TranspositionTable>`.
+A key is stored in one of the ``PROBES`` slots following its hash slot.
+
+Reads are lock-free (a slot is only returned if its content matches the
+probed key, see :class:`TranspositionTable
+<connect4.transposition.TranspositionTable>`), and writes are serialized with
+an exclusive ``flock`` on the file. The file never grows: once the slots of a
+key are all used, the shallowest entry is replaced. Use :func:`compact` (or
+``python -m connect4.store compact``) to drop shallow entries or resize the
+file.
+
+Example::
+
+    $ python -m connect4.store info results.c4tt
+    $ python -m connect4.store compact results.c4tt -min-depth 4
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import errno
+import mmap
+import os
+import struct
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: writes are not locked
+
+from . import profiling
+from .transposition import TranspositionTable
+
+
+class PersistentStore(TranspositionTable):
+    """A transposition table backed by a memory-mapped file.
+
+    It has the same interface as :class:`TranspositionTable
+    <connect4.transposition.TranspositionTable>`, so it can be used by
+    :class:`Minimax <connect4.player.Minimax>` (see its ``store`` argument).
+
+    Args:
+        path(str): The path of the file. It is created if it doesn't exist.
+        mb(float): The size in megabytes of the file, only used when it is
+            created. Default is ``64``.
+
+    Attributes:
+        path(str): The path of the file.
+        n_slots(int): The number of slots of the file.
+    """
+
+    MAGIC = b'C4TT'
+    VERSION = 2
+    _header = struct.Struct('<4sIQ')
+    HEADER_SIZE = 32
+    PROBES = 8
+
+    def __init__(self, path, mb=64):
+
+        self.path = path
+        if not os.path.exists(path):
+            n_slots = max(self.PROBES,
+                          int(mb * 2**20) // self.SLOT_SIZE)
+            self._create(path, n_slots)
+
+        self.buf = None
+        self._open()
+
+    def _open(self):
+        """Open and map the file at :attr:`path`."""
+
+        self._file = open(self.path, 'r+b')
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        stat = os.fstat(self._file.fileno())
+        self._inode = (stat.st_dev, stat.st_ino)
+        magic, version, n_slots = self._header.unpack_from(self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.close()
+            raise ValueError(self.path + ' is not a store file.')
+
+        TranspositionTable.__init__(
+            self, n_slots, buf=memoryview(self._mmap)[self.HEADER_SIZE:])
+
+    @classmethod
+    def _create(cls, path, n_slots):
+        """Create an empty store file with ``n_slots`` slots, unless another
+        process created it first."""
+
+        # Write to a temporary file first so that no process can open a
+        # partially written file. It is then linked, which unlike a rename
+        # never replaces a file that another process already uses.
+        tmp_path = '{0}.{1}.tmp'.format(path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as f:
+                header = cls._header.pack(cls.MAGIC, cls.VERSION, n_slots)
+                f.write(header.ljust(cls.HEADER_SIZE, b'\x00'))
+                f.truncate(cls.HEADER_SIZE + n_slots * cls.SLOT_SIZE)
+            os.link(tmp_path, path)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _lock(self):
+
+        if fcntl is None:
+            return
+
+        # If the file was replaced (see compact) while waiting for the lock,
+        # the new one is opened: writes to the old one would be lost.
+        while True:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            stat = os.stat(self.path)
+            if (stat.st_dev, stat.st_ino) == self._inode:
+                return
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self.close()
+            self._open()
+
+    def _unlock(self):
+
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _slots(self, key):
+        """Generator function to iterate over the ``(offset, w0, w1, w2)``
+        content of the slots where ``key`` may be stored."""
+
+        for i in range(self.PROBES):
+            offset = ((key + i) % self.n_slots) * self.SLOT_SIZE
+            w0, w1, w2 = self._slot.unpack_from(self.buf, offset)
+            yield offset, w0, w1, w2
+
+    def probe(self, key):
+        """Look for the entry of a position.
+
+        Args:
+            key(int): The key of the position.
+
+        Returns:
+            A ``(score, bound, depth, col)`` tuple, or ``None`` if the
+            position isn't in the store.
+        """
+
+        for offset, w0, w1, w2 in self._slots(key):
+            if not w2:
+                return None
+            if w0 ^ w1 ^ w2 == key:
+                depth, bound, col = (w2 >> 16, (w2 >> 8) & 0xff,
+                                     (w2 & 0xff) - 1)
+                return (self._unpack_score(w1), bound, depth,
+                        None if col < 0 else col)
+        return None
+
+    def store(self, key, score, bound, depth, col):
+        """Store the entry of a position.
+
+        The entry goes in the slot of the same position if there is one (and
+        if it wasn't searched at a greater depth), else in the first empty
+        slot, else in place of the shallowest entry.
+
+        Args:
+            key(int): The key of the position.
+            score(int): The score of the position.
+            bound: One of ``EXACT``, ``LOWER`` or ``UPPER``.
+            depth(int): The depth the position was searched at.
+            col(int): The best column, or ``None``.
+        """
+
+        self._lock()
+        try:
+            target, target_depth = None, None
+            for offset, w0, w1, w2 in self._slots(key):
+                if not w2 or w0 ^ w1 ^ w2 == key:
+                    if w2 and (w2 >> 16) > depth:
+                        return
+                    target = offset
+                    break
+                if target is None or (w2 >> 16) < target_depth:
+                    target, target_depth = offset, w2 >> 16
+
+            w1 = self._pack_score(score)
+            w2 = (depth << 16) | (bound << 8) | (0 if col is None else col + 1)
+            self._slot.pack_into(self.buf, target, key ^ w1 ^ w2, w1, w2)
+        finally:
+            self._unlock()
+
+    def clear(self):
+        """Remove all entries."""
+
+        self._lock()
+        try:
+            TranspositionTable.clear(self)
+        finally:
+            self._unlock()
+
+    def entries(self):
+        """Generator function to iterate over all the entries of the store.
+
+        Returns:
+            All ``(key, score, bound, depth, col)`` entries.
+        """
+
+        for i in range(self.n_slots):
+            w0, w1, w2 = self._slot.unpack_from(self.buf,
+                                                i * self.SLOT_SIZE)
+            if w2:
+                col = (w2 & 0xff) - 1
+                yield (w0 ^ w1 ^ w2, self._unpack_score(w1), (w2 >> 8) & 0xff,
+                       w2 >> 16, None if col < 0 else col)
+
+    def __len__(self):
+
+        return sum(1 for _ in self.entries())
+
+    def close(self):
+        """Close the file. Written entries are already on disk (as far as the
+        OS is concerned)."""
+
+        if self.buf is not None:
+            self.buf.release()
+            self.buf = None
+        self._mmap.close()
+        self._file.close()
+
+    def __reduce__(self):
+
+        return (self.__class__, (self.path,))
+
+
+def compact(path, mb=None, min_depth=0):
+    """Rewrite a store, dropping its shallow entries and possibly resizing
+    it.
+
+    The store is locked during the compaction, and the new file atomically
+    replaces the old one. Processes that still have the old file open read
+    from it until their next write, which reopens the store.
+
+    Args:
+        path(str): The path of the store.
+        mb(float, optional): The new size in megabytes. Default is to keep
+            the current size.
+        min_depth(int): Entries searched at a lower depth are dropped.
+            Default is ``0``.
+
+    Returns:
+        (tuple): The number of entries before and after the compaction.
+    """
+
+    old = PersistentStore(path)
+    old._lock()
+    try:
+        if mb is None:
+            n_slots = old.n_slots
+        else:
+            n_slots = max(old.PROBES, int(mb * 2**20) // old.SLOT_SIZE)
+
+        tmp_path = '{0}.compact.{1}'.format(path, os.getpid())
+        PersistentStore._create(tmp_path, n_slots)
+        new = PersistentStore(tmp_path)
+
+        # Deepest entries first, so that they win when slots are scarce.
+        entries = sorted((e for e in old.entries() if e[3] >= min_depth),
+                         key=lambda e: -e[3])
+        for key, score, bound, depth, col in entries:
+            new.store(key, score, bound, depth, col)
+        n_before, n_after = sum(1 for _ in old.entries()), len(new)
+        new.close()
+
+        os.rename(tmp_path, path)
+    finally:
+        old._unlock()
+        old.close()
+
+    return n_before, n_after
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+             description='Inspect or compact a store of search results.',
+             epilog='Example: python -m connect4.store compact ' +
+                    'results.c4tt -min-depth 4')
+
+    parser.add_argument('command', choices=('info', 'compact'),
+                        help='The command to run.')
+    parser.add_argument('path', type=str, help='The store file.')
+    parser.add_argument('-mb', type=float, default=None,
+                        help='The new size in megabytes of the store ' +
+                        '(compact only). (default: current size)')
+    parser.add_argument('-min-depth', type=int, default=0,
+                        help='Drop the entries searched at a lower depth ' +
+                        '(compact only). (default: 0)')
+
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    if not os.path.exists(args.path):
+        parser.error(args.path + ' does not exist.')
+
+    if args.command == 'info':
+        s = PersistentStore(args.path)
+        n = len(s)
+        print('{0}: {1} entries, {2} slots ({3:.1%} full)'.format(
+              args.path, n, s.n_slots, n / s.n_slots))
+        s.close()
+    else:
+        n_before, n_after = profiling.run(args, compact, args.path,
+                                          mb=args.mb,
+                                          min_depth=args.min_depth)
+        print('{0}: {1} entries before, {2} after.'.format(
+              args.path, n_before, n_after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""
+This module contains a retrograde-analysis tablebase generator for small
+board geometries, and the :class:`Tablebase` player that uses it.
+
+The generator first enumerates all the reachable positions, level by level
+(a level being the positions with the same number of coins). Each level only
+depends on the previous one, and is saved to a temporary file. Then the
+levels are solved backwards, from the full boards to the empty board: the
+value of a position only depends on its children, which are all in the next
+level and whose values are already in the tablebase. Only one level is in
+memory at any time.
+
+The tablebase file is a memory-mapped open-addressing hash table with a
+single 64 bits word per position: the unique key of the position (see
+below) in the lower 48 bits, and its value in the upper 16 bits. The value of
+a position is its result for the player to move (``WIN``, ``DRAW`` or
+``LOSS``) and its distance, i.e. the number of moves before the end of the
+game when the winner wins as fast as possible and the loser loses as slowly
+as possible. Positions where the game is already over are not stored.
+
+The key of a position is made of ``n_rows + 1`` bits per column: the bits of
+the coins of the first player, plus a bit just above the top coin of the
+column. It is unique, and it fits in 48 bits as long as ``n_cols * (n_rows +
+1) <= 48``. The number of positions grows very fast with the size of the
+board though: 4x4 and 5x4 boards are solved in seconds to minutes, while a
+6x5 board is out of reach of a pure Python generator.
+
+Example::
+
+    $ python -m connect4.tablebase generate 4x4.c4tb -rows 4 -cols 4
+    $ python -m connect4.tablebase info 4x4.c4tb
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from array import array
+
+from . import profiling
+from .game import Board
+from .player import Player
+
+
+WIN, DRAW, LOSS = 1, 2, 3
+RESULTS = {WIN: 'wins', DRAW: 'draws', LOSS: 'loses'}
+
+
+class Bitboards(object):
+    """Bitboard operations for a board geometry.
+
+    A position is represented by two integers: ``first``, the cells of the
+    coins of the first player, and ``mask``, the occupied cells. Cell (``row``,
+    ``col``) is bit ``col * (n_rows + 1) + n_rows - 1 - row``, i.e. each column
+    starts from the bottom and has an extra bit on top.
+
+    Args:
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+        to_win(int): The number of aligned coins needed to win.
+    """
+
+    def __init__(self, n_rows, n_cols, to_win):
+
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.to_win = to_win
+        self.height = n_rows + 1
+        self.bottoms = [1 << (col * self.height) for col in range(n_cols)]
+        self.tops = [1 << (col * self.height + n_rows - 1)
+                     for col in range(n_cols)]
+        self.columns = [((1 << n_rows) - 1) << (col * self.height)
+                        for col in range(n_cols)]
+        # The shifts of the vertical, horizontal and diagonal directions.
+        self.shifts = (1, self.height, self.height + 1, self.height - 1)
+
+    def moves(self, mask):
+        """Generator function to iterate over the ``(col, cell)`` moves of a
+        position, ``cell`` being the bit of the cell where the coin lands."""
+
+        for col in range(self.n_cols):
+            if not mask & self.tops[col]:
+                yield col, (mask + self.bottoms[col]) & self.columns[col]
+
+    def wins(self, bits):
+        """Check if some coins contain ``to_win`` aligned coins.
+
+        Args:
+            bits(int): The cells of the coins.
+
+        Returns:
+            ``True`` if the coins are winning, else ``False``.
+        """
+
+        for shift in self.shifts:
+            aligned = bits
+            for i in range(1, self.to_win):
+                aligned &= bits >> (i * shift)
+                if not aligned:
+                    break
+            else:
+                return True
+        return False
+
+    def key(self, first, mask):
+        """Return the key of a position."""
+
+        key = first
+        for col in range(self.n_cols):
+            key |= (mask + self.bottoms[col]) & (self.columns[col] |
+                                                 self.tops[col] << 1)
+        return key
+
+    def decode(self, key):
+        """Return the ``(first, mask)`` position of a key."""
+
+        first = mask = 0
+        for col in range(self.n_cols):
+            column = (key >> (col * self.height)) & ((1 << self.height) - 1)
+            top = column.bit_length() - 1
+            first |= (column ^ (1 << top)) << (col * self.height)
+            mask |= ((1 << top) - 1) << (col * self.height)
+        return first, mask
+
+    def from_board(self, board, first_coin):
+        """Return the ``(first, mask)`` position of a board.
+
+        Args:
+            board: The board.
+            first_coin(str): The coin of the first player.
+        """
+
+        first = mask = 0
+        for row, col, coin in board.occupied():
+            bit = 1 << (col * self.height + self.n_rows - 1 - row)
+            mask |= bit
+            if coin == first_coin:
+                first |= bit
+        return first, mask
+
+
+class TablebaseFile(object):
+    """A tablebase file, opened through a memory map.
+
+    Args:
+        path(str): The path of the file.
+        writable(bool): Whether to open the file for writing. Default is
+            ``False``.
+
+    Attributes:
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+        to_win(int): The number of aligned coins needed to win.
+        n_slots(int): The number of slots of the hash table.
+        n_positions(int): The number of positions in the table.
+    """
+
+    MAGIC = b'C4TB'
+    VERSION = 1
+    _header = struct.Struct('<4sIHHHxxQQ')
+    HEADER_SIZE = 32
+    _word = struct.Struct('<Q')
+    KEY_BITS = 48
+    KEY_MASK = (1 << KEY_BITS) - 1
+
+    def __init__(self, path, writable=False):
+
+        self.path = path
+        self.writable = writable
+        self._mmap = None
+        self._file = open(path, 'r+b' if writable else 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=(
+            mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ))
+        (magic, version, self.n_rows, self.n_cols, self.to_win,
+         self.n_slots, self.n_positions) = self._header.unpack_from(
+            self._mmap, 0)
+        if magic != self.MAGIC or version != self.VERSION:
+            self.writable = False
+            self.close()
+            raise ValueError(path + ' is not a tablebase file.')
+
+    @classmethod
+    def create(cls, path, n_rows, n_cols, to_win, n_slots):
+        """Create an empty tablebase file, and open it for writing.
+
+        Args:
+            path(str): The path of the file.
+            n_rows(int): The number of rows of the board.
+            n_cols(int): The number of columns of the board.
+            to_win(int): The number of aligned coins needed to win.
+            n_slots(int): The number of slots of the hash table.
+
+        Returns:
+            (:class:`TablebaseFile`): The file.
+        """
+
+        with open(path, 'wb') as f:
+            header = cls._header.pack(cls.MAGIC, cls.VERSION, n_rows,
+                                      n_cols, to_win, n_slots, 0)
+            f.write(header.ljust(cls.HEADER_SIZE, b'\x00'))
+            f.truncate(cls.HEADER_SIZE + n_slots * cls._word.size)
+        return cls(path, writable=True)
+
+    def _offset(self, key):
+        """Return the offset of the slot of ``key``, and its content."""
+
+        i = ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) % self.n_slots
+        while True:
+            offset = self.HEADER_SIZE + i * self._word.size
+            word = self._word.unpack_from(self._mmap, offset)[0]
+            if not word or word & self.KEY_MASK == key:
+                return offset, word
+            i = (i + 1) % self.n_slots
+
+    def probe(self, key):
+        """Look for the value of a position.
+
+        Args:
+            key(int): The key of the position.
+
+        Returns:
+            A ``(result, distance)`` tuple, or ``None`` if the position isn't
+            in the table.
+        """
+
+        word = self._offset(key)[1]
+        if not word:
+            return None
+        value = word >> self.KEY_BITS
+        return value >> 8, value & 0xff
+
+    def store(self, key, result, distance):
+        """Store the value of a position.
+
+        Args:
+            key(int): The key of the position.
+            result(int): ``WIN``, ``DRAW`` or ``LOSS``.
+            distance(int): The distance of the result.
+        """
+
+        offset, word = self._offset(key)
+        if not word:
+            self.n_positions += 1
+        self._word.pack_into(self._mmap, offset,
+                             key | ((result << 8 | distance) << self.KEY_BITS))
+
+    def close(self):
+        """Close the file, writing the number of positions first if it was
+        opened for writing."""
+
+        if self._mmap is not None and not self._mmap.closed:
+            if self.writable:
+                header = self._header.pack(
+                    self.MAGIC, self.VERSION, self.n_rows, self.n_cols,
+                    self.to_win, self.n_slots, self.n_positions)
+                self._mmap[:len(header)] = header
+            self._mmap.close()
+        self._file.close()
+
+
+def _rank(value):
+    """Rank the ``(result, distance)`` value of a child position: the higher,
+    the better for the player who moved to the child."""
+
+    result, distance = value
+    if result == LOSS:
+        return 1000 - distance
+    elif result == DRAW:
+        return 0
+    return -1000 + distance
+
+
+def best_child(values):
+    """Return the value of a position given the values of its children.
+
+    Args:
+        values(list): The ``(result, distance)`` values of the children, for
+            the player to move in the children.
+
+    Returns:
+        A ``(result, distance)`` tuple for the player to move in the
+        position.
+    """
+
+    result, distance = max(values, key=_rank)
+    return {LOSS: WIN, DRAW: DRAW, WIN: LOSS}[result], distance + 1
+
+
+def generate(path, n_rows, n_cols, to_win=4, load=.5, verbose=False):
+    """Solve all the positions of a board geometry, and write them to a
+    tablebase file.
+
+    Args:
+        path(str): The path of the tablebase file. The levels are saved in a
+            temporary directory next to it.
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+        to_win(int): The number of aligned coins needed to win. Default is
+            ``4``.
+        load(float): The maximum load factor of the hash table. Default is
+            ``.5``.
+        verbose(bool): Whether to print the progress. Default is ``False``.
+
+    Returns:
+        (int): The number of positions.
+    Raises:
+        ValueError: if the keys of the geometry don't fit in 48 bits.
+    """
+
+    if n_cols * (n_rows + 1) > TablebaseFile.KEY_BITS:
+        raise ValueError('The board is too large for a tablebase.')
+
+    bitboards = Bitboards(n_rows, n_cols, to_win)
+    n_cells = n_rows * n_cols
+    tmp_dir = tempfile.mkdtemp(dir=os.path.dirname(os.path.abspath(path)))
+
+    def level_path(n):
+        return os.path.join(tmp_dir, '{0}.level'.format(n))
+
+    def log(*args):
+        if verbose:
+            print(*args)
+
+    try:
+        # Enumerate the positions, level by level.
+        sizes = []
+        level = array(str('Q'), [bitboards.key(0, 0)])
+        for n in range(n_cells + 1):
+            with open(level_path(n), 'wb') as f:
+                level.tofile(f)
+            sizes.append(len(level))
+            log('level {0}: {1} positions'.format(n, len(level)))
+            if n == n_cells:
+                break
+
+            children = set()
+            for key in level:
+                first, mask = bitboards.decode(key)
+                for _, cell in bitboards.moves(mask):
+                    if n % 2 == 0:
+                        child, mover = first | cell, first | cell
+                    else:
+                        child, mover = first, (mask | cell) ^ first
+                    if not bitboards.wins(mover):
+                        children.add(bitboards.key(child, mask | cell))
+            level = array(str('Q'), sorted(children))
+            del children
+
+        # Solve the levels backwards.
+        table = TablebaseFile.create(path, n_rows, n_cols, to_win,
+                                     int(sum(sizes) / load) + 1)
+        try:
+            for n in reversed(range(n_cells + 1)):
+                level = array(str('Q'))
+                with open(level_path(n), 'rb') as f:
+                    level.fromfile(f, sizes[n])
+                for key in level:
+                    first, mask = bitboards.decode(key)
+                    values = []
+                    for _, cell in bitboards.moves(mask):
+                        if n % 2 == 0:
+                            child, mover = first | cell, first | cell
+                        else:
+                            child, mover = first, (mask | cell) ^ first
+                        if bitboards.wins(mover):
+                            values = [(LOSS, 0)]  # can't do better
+                            break
+                        values.append(table.probe(
+                            bitboards.key(child, mask | cell)))
+                    if values:
+                        table.store(key, *best_child(values))
+                    else:
+                        table.store(key, DRAW, 0)  # full board
+                os.remove(level_path(n))
+                log('level {0} solved'.format(n))
+            n_positions = table.n_positions
+        finally:
+            table.close()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    return n_positions
+
+
+class Tablebase(Player):
+    """A perfect player that looks up its moves in a tablebase.
+
+    The player wins as fast as possible, and loses as slowly as possible.
+
+    Args:
+        coin(str): The coin representing the player.
+        path(str): The path of a tablebase file (see :func:`generate`). Its
+            geometry must be the one of the game.
+
+    Attributes:
+        table(:class:`TablebaseFile`): The tablebase.
+    """
+
+    def __init__(self, coin, path):
+
+        Player.__init__(self, coin)
+        self.table = TablebaseFile(path)
+        self.bitboards = Bitboards(self.table.n_rows, self.table.n_cols,
+                                   self.table.to_win)
+
+    def probe(self, board, coin):
+        """Look for the value of a position.
+
+        Args:
+            board: The board.
+            coin(str): The coin of the player to move.
+
+        Returns:
+            A ``(result, distance)`` tuple for the player to move, or
+            ``None`` if the position isn't in the table (e.g. if the game is
+            over).
+        """
+
+        if (board.n_rows, board.n_cols) != (self.table.n_rows,
+                                            self.table.n_cols):
+            raise ValueError('The tablebase is for {0}x{1} boards.'.format(
+                             self.table.n_rows, self.table.n_cols))
+
+        n = sum(1 for _ in board.occupied())
+        if n % 2 == 0:
+            first_coin = coin
+        else:
+            first_coin = next(c for _, _, c in board.occupied() if c != coin)
+        first, mask = self.bitboards.from_board(board, first_coin)
+        return self.table.probe(self.bitboards.key(first, mask))
+
+    def play(self, board, time_left=None):
+        """Choose the best column to play on.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The current board.
+            time_left(float, optional): Not used.
+
+        Returns:
+            (int): The column to play on.
+        """
+
+        if self.to_win is not None and self.to_win != self.table.to_win:
+            raise ValueError('The tablebase is for to_win={0}.'.format(
+                             self.table.to_win))
+
+        # Center columns first, for the nicest games among the best moves.
+        center = (board.n_cols - 1) / 2
+        cols = sorted(board.free_columns(), key=lambda c: abs(c - center))
+        best_col, best_rank = None, None
+        for col in cols:
+            row = board.insert(col, self.coin)
+            try:
+                if board.connects(row, col, self.table.to_win):
+                    return col
+                rank = _rank(self.probe(board, self.opponent.coin))
+            finally:
+                board.remove(col)
+            if best_rank is None or rank > best_rank:
+                best_col, best_rank = col, rank
+
+        return best_col
+
+    def close(self):
+        """Close the tablebase."""
+
+        self.table.close()
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+             description='Generate or inspect a tablebase.',
+             epilog='Example: python -m connect4.tablebase generate ' +
+                    '4x4.c4tb -rows 4 -cols 4')
+
+    parser.add_argument('command', choices=('generate', 'info'),
+                        help='The command to run.')
+    parser.add_argument('path', type=str, help='The tablebase file.')
+    parser.add_argument('-rows', type=int, default=4,
+                        help='The number of rows (generate only). ' +
+                        '(default: 4)')
+    parser.add_argument('-cols', type=int, default=4,
+                        help='The number of columns (generate only). ' +
+                        '(default: 4)')
+    parser.add_argument('-to-win', type=int, default=4,
+                        help='The number of aligned coins needed to win ' +
+                        '(generate only). (default: 4)')
+    profiling.add_arguments(parser)
+
+    args = parser.parse_args()
+    if args.command == 'generate':
+        try:
+            n = profiling.run(args, generate, args.path, args.rows,
+                              args.cols, args.to_win, verbose=True)
+        except ValueError as e:
+            parser.error(str(e))
+        print('{0}: {1} positions.'.format(args.path, n))
+    else:
+        if not os.path.exists(args.path):
+            parser.error(args.path + ' does not exist.')
+        table = TablebaseFile(args.path)
+        player = Tablebase('X', args.path)
+        value = player.probe(Board(table.n_rows, table.n_cols), 'X')
+        print('{0}: {1}x{2} board, to_win={3}, {4} positions, {5} bytes.'
+              .format(args.path, table.n_rows, table.n_cols, table.to_win,
+                      table.n_positions, os.path.getsize(args.path)))
+        print('The first player {0} in {1} moves.'.format(
+              RESULTS[value[0]], value[1]))
+        player.close()
+        table.close()
+
+
+if __name__ == "__main__":
+    main()
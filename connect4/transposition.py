@@ -0,0 +1,338 @@
+"""
+This module contains position hashing and the transposition tables used by
+the :class:`Minimax <connect4.player.Minimax>` player.
+"""
+
+from __future__ import (absolute_import, division, print_function,
+                        unicode_literals)
+import random
+import struct
+import weakref
+from array import array
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None  # Python < 3.8
+
+
+class Zobrist:
+    """Zobrist hashing of board positions.
+
+    Each (row, column, coin) triplet is assigned a random 64 bits number, and
+    the key of a position is the xor of the numbers of all its coins. Keys can
+    then be updated incrementally when a coin is inserted or removed.
+
+    The random numbers only depend on the board geometry and on ``to_win``, so
+    keys are identical across processes.
+
+    Args:
+        n_rows(int): The number of rows of the board.
+        n_cols(int): The number of columns of the board.
+        to_win(int): The number of aligned pieces required to win the game.
+        coins(tuple of str): The two coins that can appear on the board.
+
+    Attributes:
+        table(list): ``table[row][col][i]`` is the number of the coin
+            ``coins[i]`` at position (``row``, ``col``).
+        base(int): The key of the empty board.
+        side(int): A number to xor keys with, for searches that need to
+            distinguish the player to move.
+    """
+
+    def __init__(self, n_rows, n_cols, to_win, coins):
+
+        self.n_rows = n_rows
+        self.n_cols = n_cols
+        self.to_win = to_win
+        self.coins = tuple(coins)
+        rng = random.Random('{0}x{1}x{2}'.format(n_rows, n_cols, to_win))
+        self.base = rng.getrandbits(64)
+        self.table = [[(rng.getrandbits(64), rng.getrandbits(64))
+                       for _ in range(n_cols)] for _ in range(n_rows)]
+        self.side = rng.getrandbits(64)
+
+    def key(self, board):
+        """Compute the key of a board from scratch.
+
+        Args:
+            board(:class:`Board <connect4.game.Board>`): The board.
+
+        Returns:
+            (int): The key of the board.
+        """
+
+        k = self.base
+        for row, col, coin in board.occupied():
+            k ^= self.table[row][col][self.coins.index(coin)]
+        return k
+
+    def update(self, key, row, col, coin):
+        """Return the key after ``coin`` was inserted or removed at (``row``,
+        ``col``)."""
+
+        return key ^ self.table[row][col][self.coins.index(coin)]
+
+    def move(self, key, row, col, coin):
+        """Return the key after ``coin`` was played at (``row``, ``col``),
+        for keys that include the player to move (see :attr:`side`)."""
+
+        return key ^ self.side ^ self.table[row][col][self.coins.index(coin)]
+
+
+class TranspositionTable:
+    """A fixed size transposition table.
+
+    Entries are stored in a flat buffer of ``n_slots`` slots of three 64 bits
+    words: ``key ^ w1 ^ w2``, ``w1`` (the score) and ``w2`` (the depth, the
+    bound and the best column). An entry is only considered valid if its three
+    words xor back to the probed key, so that concurrent unsynchronized
+    writers can never make a probe return a corrupted entry (this is the
+    usual lock-less hashing trick).
+
+    Args:
+        n_slots(int): The number of slots of the table.
+        buf(writable buffer, optional): The memory to store the table into.
+            A new zero-filled ``bytearray`` is used if not given.
+
+    Attributes:
+        EXACT, LOWER, UPPER: The possible bound types of a score.
+    """
+
+    EXACT, LOWER, UPPER = 1, 2, 3
+    SLOT_SIZE = 24
+    _slot = struct.Struct('<QQQ')
+    _int64 = struct.Struct('<q')
+    _uint64 = struct.Struct('<Q')
+
+    def __init__(self, n_slots, buf=None):
+
+        self.n_slots = n_slots
+        if buf is None:
+            buf = bytearray(n_slots * self.SLOT_SIZE)
+        self.buf = buf
+
+    @classmethod
+    def from_megabytes(cls, mb, **kwargs):
+        """Build a table using (at most) ``mb`` megabytes of memory."""
+
+        return cls(max(1, int(mb * 2**20) // cls.SLOT_SIZE), **kwargs)
+
+    def _pack_score(self, score):
+
+        return self._uint64.unpack(self._int64.pack(score))[0]
+
+    def _unpack_score(self, w):
+
+        return self._int64.unpack(self._uint64.pack(w))[0]
+
+    def probe(self, key):
+        """Look for the entry of a position.
+
+        Args:
+            key(int): The key of the position.
+
+        Returns:
+            A ``(score, bound, depth, col)`` tuple, or ``None`` if the
+            position isn't in the table. ``col`` is ``None`` if no best column
+            was recorded.
+        """
+
+        offset = (key % self.n_slots) * self.SLOT_SIZE
+        w0, w1, w2 = self._slot.unpack_from(self.buf, offset)
+        if w0 ^ w1 ^ w2 != key or not w2:
+            return None
+        depth, bound, col = w2 >> 16, (w2 >> 8) & 0xff, (w2 & 0xff) - 1
+        return (self._unpack_score(w1), bound, depth,
+                None if col < 0 else col)
+
+    def store(self, key, score, bound, depth, col):
+        """Store the entry of a position.
+
+        An entry of the same position searched at a greater depth is never
+        overwritten. Entries of other positions always are.
+
+        Args:
+            key(int): The key of the position.
+            score(int): The score of the position.
+            bound: One of ``EXACT``, ``LOWER`` or ``UPPER``.
+            depth(int): The depth the position was searched at.
+            col(int): The best column, or ``None``.
+        """
+
+        offset = (key % self.n_slots) * self.SLOT_SIZE
+        w0, w1, w2 = self._slot.unpack_from(self.buf, offset)
+        if w0 ^ w1 ^ w2 == key and w2 and (w2 >> 16) > depth:
+            return
+        w1 = self._pack_score(score)
+        w2 = (depth << 16) | (bound << 8) | (0 if col is None else col + 1)
+        self._slot.pack_into(self.buf, offset, key ^ w1 ^ w2, w1, w2)
+
+    def clear(self):
+        """Remove all entries."""
+
+        self.buf[:] = b'\x00' * len(self.buf)
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """A transposition table living in shared memory, so that it can be used
+    concurrently by many processes.
+
+    The table is created by a first process, and other processes attach to it
+    by ``name``. Pickling a table (e.g. when passing it to a
+    ``multiprocessing.Process``) attaches to the same memory in the
+    unpickling process. The memory is freed by :meth:`close`, or once the
+    table that created it is garbage collected.
+
+    Args:
+        n_slots(int): The number of slots of the table.
+        name(str, optional): The name of an existing table to attach to. If
+            ``None``, a new table is created.
+    """
+
+    def __init__(self, n_slots, name=None):
+
+        if shared_memory is None:
+            raise RuntimeError('Shared transposition tables require '
+                               'Python 3.8 or later.')
+
+        if name is None:
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=n_slots * self.SLOT_SIZE)
+            self._owner = True
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        self.name = self._shm.name
+
+        TranspositionTable.__init__(self, n_slots, buf=self._shm.buf)
+        if self._owner:
+            self.clear()
+        self._finalizer = weakref.finalize(self, _release_shared_memory,
+                                           self._shm, self._owner)
+
+    def __reduce__(self):
+
+        return (self.__class__, (self.n_slots, self.name))
+
+    def close(self):
+        """Detach from the shared memory, and free it if this table created
+        it."""
+
+        self.buf = None
+        self._finalizer()
+
+
+def _release_shared_memory(shm, owner):
+    """Detach from the shared memory of a table, and free it if ``owner``."""
+
+    shm.close()
+    if owner:
+        shm.unlink()
+
+
+class EvaluationCache:
+    """A bounded cache of board evaluations.
+
+    When the cache is full, entries are evicted with the *clock* algorithm
+    (an approximation of LRU): each entry has a reference bit, set when the
+    entry is used. The clock hand sweeps over the entries, clearing reference
+    bits, and evicts the first entry whose bit is already cleared.
+
+    Keys and values are packed in arrays of 64 bits integers, so that only
+    the index of the keys costs Python objects. A pickled cache keeps its
+    capacity but not its entries.
+
+    Args:
+        mb(float): The memory budget of the cache, in megabytes.
+
+    Attributes:
+        capacity(int): The maximum number of entries.
+        hits(int): The number of successful lookups.
+        misses(int): The number of failed lookups.
+    """
+
+    # The size of an entry, as measured with tracemalloc: key and index
+    # objects, dict slot, array slots of the key and the value and reference
+    # bit. It is between 110 and 141 bytes, depending on how full the dict
+    # is when the cache is.
+    ENTRY_SIZE = 144
+
+    def __init__(self, mb):
+
+        self.capacity = max(1, int(mb * 2**20) // self.ENTRY_SIZE)
+        self.clear()
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+
+        self._slots = {}  # key -> index in the arrays below
+        self._keys = array('Q')
+        self._values = array('q')
+        self._referenced = bytearray()
+        self._hand = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+
+        return len(self._keys)
+
+    def __getstate__(self):
+
+        # The entries aren't worth sending to another process.
+        return {'capacity': self.capacity}
+
+    def __setstate__(self, state):
+
+        self.capacity = state['capacity']
+        self.clear()
+
+    def get(self, key):
+        """Look for the value of a key.
+
+        Args:
+            key(int): The key.
+
+        Returns:
+            The cached value, or ``None`` if the key isn't in the cache.
+        """
+
+        i = self._slots.get(key)
+        if i is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._referenced[i] = 1
+        return self._values[i]
+
+    def put(self, key, value):
+        """Add an entry to the cache, evicting another one if needed.
+
+        Args:
+            key(int): The key, a 64 bits unsigned integer.
+            value(int): The value, a 64 bits signed integer.
+        """
+
+        i = self._slots.get(key)
+        if i is not None:
+            self._values[i] = value
+            self._referenced[i] = 1
+            return
+
+        if len(self._keys) < self.capacity:
+            self._slots[key] = len(self._keys)
+            self._keys.append(key)
+            self._values.append(value)
+            self._referenced.append(1)
+            return
+
+        while self._referenced[self._hand]:
+            self._referenced[self._hand] = 0
+            self._hand = (self._hand + 1) % self.capacity
+        i = self._hand
+        del self._slots[self._keys[i]]
+        self._slots[key] = i
+        self._keys[i] = key
+        self._values[i] = value
+        self._referenced[i] = 1
+        self._hand = (i + 1) % self.capacity
@@ -2,11 +2,18 @@
 This module tests the game class and the board class.
 """
 
+import pickle
+import random
+import time
+
 import pytest
 
 from connect4 import Game
 from connect4 import Board
+from connect4 import CompactBoard
+from connect4 import SparseBoard
 from connect4 import Player
+from connect4 import Minimax
 
 
 def test_insert():
@@ -82,3 +89,200 @@ def test_check_winner():
     for i in range(g.to_win):
         g.board.grid[i][i] = 'O'
     assert g.check_winner() is player2
+
+
+def test_remove():
+
+    board = Board(5, 5)
+    with pytest.raises(ValueError):
+        board.remove(0)
+    board.insert(0, 'X')
+    board.insert(0, 'O')
+    assert board.remove(0) == 3
+    assert board.grid[3][0] == board.EMPTY
+    assert board.grid[4][0] == 'X'
+
+
+def test_sparse_board():
+
+    n_rows, n_cols, to_win = 7, 8, 4
+    sparse = SparseBoard(n_rows, n_cols, to_win)
+    dense = Board(n_rows, n_cols)
+
+    def potential(coin):
+        # Brute force computation of the potential of a coin
+        p = 0
+        for r in range(n_rows):
+            for c in range(n_cols):
+                for dr, dc in sparse.DIRECTIONS:
+                    cells = [(r + k * dr, c + k * dc) for k in range(to_win)]
+                    if not all(0 <= i < n_rows and 0 <= j < n_cols
+                               for (i, j) in cells):
+                        continue
+                    window = [dense.grid[i][j] for (i, j) in cells]
+                    if all(x in (coin, dense.EMPTY) for x in window):
+                        p += window.count(coin)**2
+        return p
+
+    rng = random.Random(0)
+    for _ in range(300):
+        if sparse.cells and rng.random() < .4:
+            col = rng.choice(list(sparse.heights))
+            assert sparse.remove(col) == dense.remove(col)
+        else:
+            col = rng.choice(list(sparse.free_columns()))
+            coin = rng.choice('XO')
+            assert sparse.insert(col, coin) == dense.insert(col, coin)
+
+        assert sparse.winning_coin() == dense.winning_coin(to_win)
+        assert sparse.potential.get('X', 0) == potential('X')
+        assert sparse.potential.get('O', 0) == potential('O')
+        assert str(sparse) == str(dense)
+
+
+def test_sparse_candidate_columns():
+
+    board = SparseBoard(50, 50, 5, radius=2)
+    assert board.candidate_columns() == [25]
+    board.insert(0, 'X')
+    board.insert(10, 'O')
+    assert board.candidate_columns() == [0, 1, 2, 8, 9, 10, 11, 12]
+
+
+def test_sparse_game():
+
+    player1 = Player('X')
+    player2 = Player('O')
+    g = Game((player1, player2), n_rows=6, n_cols=7, to_win=4, sparse=True)
+    for col in range(g.to_win):
+        g.board.insert(col, 'X')
+    assert g.check_winner() is player1
+
+
+def test_compact_board():
+
+    n_rows, n_cols, to_win = 6, 7, 4
+    compact = CompactBoard(n_rows, n_cols)
+    dense = Board(n_rows, n_cols)
+
+    rng = random.Random(0)
+    for _ in range(300):
+        if any(compact.heights) and rng.random() < .4:
+            col = rng.choice([c for c in range(n_cols) if compact.heights[c]])
+            assert compact.remove(col) == dense.remove(col)
+        else:
+            col = rng.choice(list(dense.free_columns()))
+            coin = rng.choice('XO')
+            row = compact.insert(col, coin)
+            assert row == dense.insert(col, coin)
+            assert (compact.connects(row, col, to_win) ==
+                    dense.connects(row, col, to_win))
+
+        assert compact.grid == dense.grid
+        assert compact.winning_coin(to_win) == dense.winning_coin(to_win)
+        assert list(compact.free_columns()) == list(dense.free_columns())
+        assert compact.is_full() == dense.is_full()
+        assert CompactBoard.from_bytes(compact.to_bytes()) == compact
+
+    assert CompactBoard.from_board(dense) == compact
+
+
+def test_compact_board_copy_and_pickle():
+
+    board = Board(6, 7)
+    for col in (3, 3, 2, 4, 0):
+        board.insert(col, 'X' if col % 2 else 'O')
+    compact = CompactBoard.from_board(board)
+
+    copy = compact.copy()
+    assert copy == compact
+    copy.insert(6, 'X')
+    assert copy != compact
+    assert compact.is_free(6) and compact.grid[-1][6] == compact.EMPTY
+
+    unpickled = pickle.loads(pickle.dumps(compact))
+    assert unpickled == compact
+    assert str(unpickled) == str(board)
+    assert unpickled.heights == compact.heights
+    assert (len(pickle.dumps(compact, 2)) <
+            len(pickle.dumps(board, 2)) // 2)
+
+    # with many coins, the cells are pickled as bytes
+    many = CompactBoard(3, 4)
+    for col, coin in enumerate('ABCDEFGHIJ'):
+        many.insert(col % 4, coin)
+    assert pickle.loads(pickle.dumps(many)) == many
+
+    with pytest.raises(AttributeError):
+        compact.foo = 1
+
+    # equality only depends on the content of the board
+    board1, board2 = CompactBoard(6, 7), CompactBoard(6, 7)
+    board1.insert(0, 'O')
+    board1.insert(1, 'X')
+    board2.insert(1, 'X')
+    board2.insert(0, 'O')
+    assert board1 == board2
+    assert board1.to_bytes() == board2.to_bytes()
+    board1.insert(2, 'Z')
+    board1.remove(2)
+    assert board1 == board2
+    for col in (0, 1):
+        board1.remove(col)
+    assert board1 == CompactBoard(6, 7)
+
+
+def test_time_control():
+
+    class SlowPlayer(Player):
+
+        def play(self, board, time_left=None):
+            time.sleep(.02)
+            return Player.play(self, board, time_left)
+
+    player1 = Player('X')
+    player2 = SlowPlayer('O')
+    g = Game((player1, player2), time_control=(.05, .01), verbose=False)
+    winner = g.run()
+
+    # player2 gets 10ms per move but uses 20ms: it runs out of time after a
+    # few moves (if the game lasts that long).
+    if g.flagged is not None:
+        assert g.flagged is player2
+        assert winner is player1
+        assert g.clocks[player2] < 0
+        assert g.moves[-1][0] == 'O'
+    assert g.winner is winner
+    assert all(coin == ('X', 'O')[i % 2]
+               for i, (coin, col, seconds) in enumerate(g.moves))
+    assert all(seconds >= .02 for (coin, _, seconds) in g.moves[1::2])
+
+
+def test_no_time_control():
+
+    g = Game((Player('X'), Player('O')), verbose=False)
+    g.run()
+    assert g.clocks is None
+    assert g.flagged is None
+    assert len(g.moves) == sum(1 for _ in g.board.occupied())
+
+
+class LegacyPlayer(Player):
+
+    def play(self, board):
+        return next(board.free_columns())
+
+
+def test_headless_game(capsys):
+
+    player1 = Minimax('X', depth=2)
+    g = Game((player1, LegacyPlayer('O')), verbose=False)
+    assert g.run() is player1
+    assert not player1.verbose
+    assert capsys.readouterr().out == ''
+
+    # players that don't take time_left still need it under a clock
+    g = Game((Player('X'), LegacyPlayer('O')), time_control=(10, 0),
+             verbose=False)
+    with pytest.raises(TypeError):
+        g.run()
@@ -0,0 +1,189 @@
+"""
+This module tests the transposition tables, the evaluation cache and the Lazy
+SMP search.
+"""
+
+import gc
+import pickle
+import random
+import tracemalloc
+
+import pytest
+
+from connect4 import Board
+from connect4 import Game
+from connect4 import Minimax
+from connect4 import Player
+from connect4.transposition import EvaluationCache
+from connect4.transposition import TranspositionTable
+from connect4.transposition import SharedTranspositionTable
+
+
+def test_transposition_table():
+
+    tt = TranspositionTable(n_slots=10)
+    assert tt.probe(123) is None
+
+    tt.store(123, 4, tt.LOWER, 3, 2)
+    assert tt.probe(123) == (4, tt.LOWER, 3, 2)
+    assert tt.probe(133) is None  # same slot, other key
+
+    # shallower searches don't overwrite deeper ones
+    tt.store(123, 5, tt.EXACT, 2, None)
+    assert tt.probe(123) == (4, tt.LOWER, 3, 2)
+    tt.store(123, -Minimax.WIN, tt.EXACT, 4, None)
+    assert tt.probe(123) == (-Minimax.WIN, tt.EXACT, 4, None)
+
+    # other positions always do
+    tt.store(133, 1, tt.UPPER, 0, 0)
+    assert tt.probe(123) is None
+    assert tt.probe(133) == (1, tt.UPPER, 0, 0)
+
+
+def test_shared_transposition_table():
+
+    tt = SharedTranspositionTable(n_slots=10)
+    other = SharedTranspositionTable(n_slots=10, name=tt.name)
+    tt.store(123, 4, tt.EXACT, 3, 2)
+    assert other.probe(123) == (4, tt.EXACT, 3, 2)
+    other.close()
+    tt.close()
+    tt.close()
+
+    # the memory of a table that isn't closed is freed when it is collected
+    tt = SharedTranspositionTable(n_slots=10)
+    name = tt.name
+    del tt
+    gc.collect()
+    with pytest.raises(FileNotFoundError):
+        SharedTranspositionTable(n_slots=10, name=name)
+
+
+def test_minimax_with_tt():
+
+    player1 = Minimax('X', depth=4)
+    player2 = Player('O')
+    g = Game((player1, player2))
+    for col in (3, 3, 2, 4):
+        g.board.insert(col, 'X' if col == 3 else 'O')
+
+    node = player1.root_node(g.board)
+    player1.minimax(node, 4, -player1.INF, player1.INF)
+
+    player1.tt = TranspositionTable(n_slots=1000)
+    node_tt = player1.root_node(g.board)
+    player1.minimax(node_tt, 4, -player1.INF, player1.INF)
+    assert node_tt.score == node.score
+
+
+def test_evaluation_cache():
+
+    cache = EvaluationCache(mb=EvaluationCache.ENTRY_SIZE * 3 / 2**20)
+    assert cache.capacity == 3
+
+    for key in range(3):
+        cache.put(key, key * 10)
+    assert cache.get(1) == 10
+    assert cache.get(5) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # all reference bits are set: the clock evicts the first entry
+    cache.put(3, 30)
+    assert cache.get(0) is None
+    assert len(cache) == 3
+
+    # 1 was used since, so 2 goes next
+    cache.get(1)
+    cache.put(4, 40)
+    assert cache.get(2) is None
+    assert cache.get(1) == 10
+    assert cache.get(3) == 30
+    assert cache.get(4) == 40
+
+    # the memory budget is respected
+    rng = random.Random(0)
+    for mb in (.5, 1.5, 3):
+        tracemalloc.start()
+        cache = EvaluationCache(mb)
+        for _ in range(cache.capacity):
+            cache.put(rng.getrandbits(64), rng.randint(-10**9, 10**9))
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert size <= mb * 2**20
+
+
+def test_minimax_with_eval_cache():
+
+    player1 = Minimax('X', depth=4)
+    player1_cached = Minimax('X', depth=4, eval_cache_mb=1)
+    player2 = Player('O')
+    g = Game((player1, player2))
+    g_cached = Game((player1_cached, player2))
+    for col in (3, 3, 2, 4, 2):
+        g.board.insert(col, 'X')
+        g_cached.board.insert(col, 'X')
+
+        assert player1.play(g.board) == player1_cached.play(g_cached.board)
+
+    cache = player1_cached.eval_cache
+    assert cache.hits > 0
+    assert 0 < len(cache) <= cache.capacity
+
+
+class CrashingMinimax(Minimax):
+
+    def minimax(self, node, depth, alpha, beta):
+        raise RuntimeError('crash')
+
+
+def test_lazy_smp():
+
+    player1 = Minimax('X', depth=3, n_workers=3, tt_mb=1)
+    player2 = Player('O')
+    g = Game((player1, player2))
+
+    # X wins by playing in column 3
+    for col in range(3):
+        g.board.insert(col, 'X')
+        g.board.insert(col, 'O')
+    assert player1.play(g.board) == 3
+
+    player1.close()
+
+
+def test_lazy_smp_dead_workers():
+
+    player1 = CrashingMinimax('X', depth=3, n_workers=2, tt_mb=1)
+    g = Game((player1, Player('O')), verbose=False)
+    # no clock: this used to wait forever
+    with pytest.raises(RuntimeError):
+        player1.play(g.board)
+    player1.close()
+
+
+def test_lazy_smp_worker_orders():
+
+    board = Board(6, 7)
+    orders = set()
+    for worker_id in range(1, 33):
+        player = Minimax('X')
+        player.worker_id = worker_id
+        orders.add(tuple(player.ordered_columns(board)))
+    assert len(orders) == 32
+
+
+def test_pickled_player():
+
+    player1, player2 = Minimax('X', depth=2), Minimax('O', depth=2)
+    g = Game((player1, player2), n_rows=4, n_cols=4, verbose=False)
+    g.run()
+    player1.tt = None
+    assert len(player1.endgame_cache)
+
+    # workers get the settings, not the caches nor the opponent
+    copy = pickle.loads(pickle.dumps(player1))
+    assert copy.depth == 2 and copy.history == player1.history
+    assert type(copy.opponent) is Player and copy.opponent.coin == 'O'
+    assert not len(copy.endgame_cache)
+    assert copy.endgame_cache.capacity == player1.endgame_cache.capacity
+    assert len(pickle.dumps(player1)) < 1000
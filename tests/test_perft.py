@@ -0,0 +1,61 @@
+"""
+This module tests the perft move generation counter.
+"""
+
+import itertools
+
+from connect4 import Board
+from connect4.perft import REFERENCE
+from connect4.perft import make_board
+from connect4.perft import perft
+
+
+def brute_force(n_rows, n_cols, to_win, depth):
+    # Count the leaves, wins and draws by replaying every sequence of columns
+    # from scratch, with the slow but simple win detection of Board.
+    leaves = set()
+    wins, draws = set(), set()
+    for moves in itertools.product(range(n_cols), repeat=depth):
+        board = Board(n_rows, n_cols)
+        for i, col in enumerate(moves):
+            if not board.is_free(col):
+                break
+            board.insert(col, 'XO'[i % 2])
+            if board.winning_coin(to_win) is not None:
+                wins.add(moves[:i + 1])
+                leaves.add(moves[:i + 1])
+                break
+            if board.is_full():
+                draws.add(moves[:i + 1])
+                leaves.add(moves[:i + 1])
+                break
+        else:
+            leaves.add(moves)
+    return len(leaves), len(wins), len(draws)
+
+
+def test_perft_brute_force():
+
+    for n_rows, n_cols, to_win, depth in ((2, 3, 2, 6), (2, 3, 3, 6),
+                                          (3, 3, 3, 7), (4, 4, 3, 6)):
+        board = Board(n_rows, n_cols)
+        counts = perft(board, depth, to_win)
+        assert ((counts['leaves'], counts['wins'], counts['draws']) ==
+                brute_force(n_rows, n_cols, to_win, depth))
+        assert not list(board.occupied())
+
+    assert perft(Board(2, 3), 6, 3)['draws'] > 0
+
+
+def test_perft_reference():
+
+    for (n_rows, n_cols, to_win, moves), reference in REFERENCE.items():
+        for kind in ('dense', 'compact', 'sparse'):
+            board = make_board(n_rows, n_cols, to_win, moves, kind)
+            for depth in range(1, 5):
+                counts = perft(board, depth, to_win)
+                assert ((counts['leaves'], counts['wins'], counts['draws']) ==
+                        reference[depth])
+                assert counts['nodes'] >= counts['leaves']
+
+    assert perft(Board(6, 7), 0)['nodes'] == 0
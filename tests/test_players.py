@@ -2,9 +2,17 @@
 This module tests the player module.
 """
 
+import random
+
+import pytest
+
+from connect4 import Board
 from connect4 import Player
 from connect4 import Minimax
 from connect4 import Game
+from connect4 import CompactBoard
+from connect4.benchmark import compare_algorithms
+from connect4.player import SearchTimeout
 
 
 def test_Player():
@@ -13,3 +21,245 @@ def test_Player():
     player2 = Minimax('O', depth=2)
     g = Game((player1, player2))
     g.run()
+
+
+def test_pvs():
+
+    rng = random.Random(0)
+    for _ in range(6):
+        player1 = Minimax('X', depth=5)
+        g = Game((player1, Player('O')))
+        for i in range(8):
+            col = rng.choice(list(g.board.free_columns()))
+            g.board.insert(col, 'XO'[i % 2])
+
+        alphabeta, pvs = compare_algorithms(g.board, player1)
+        assert alphabeta['col'] == pvs['col']
+        assert alphabeta['score'] == pvs['score']
+        assert alphabeta['n_nodes'] > 0 and pvs['n_nodes'] > 0
+
+    with pytest.raises(ValueError):
+        Minimax('X', algorithm='mtdf')
+
+
+def test_compact_board():
+
+    rng = random.Random(1)
+    player1 = Minimax('X', depth=3, reuse_state=False)
+    g = Game((player1, Player('O')))
+    for i in range(6):
+        col = rng.choice(list(g.board.free_columns()))
+        g.board.insert(col, 'XO'[i % 2])
+    compact = CompactBoard.from_board(g.board)
+
+    assert player1.utility(compact) == player1.utility(g.board)
+    assert player1.play(compact) == player1.play(g.board)
+    assert CompactBoard.from_board(g.board) == compact
+
+
+def test_aspiration_search():
+
+    player1 = Minimax('X', depth=3, algorithm='pvs', aspiration=1)
+    player2 = Minimax('O', depth=3)
+    g = Game((player1, player2))
+    g.run()
+
+
+def test_aspiration_timeout():
+
+    class InterruptedMinimax(Minimax):
+
+        def minimax(self, node, depth, alpha, beta):
+            # The clock runs out right after the first (narrow window) search
+            # of the last iteration, which already moved col_to_play.
+            Minimax.minimax(self, node, depth, alpha, beta)
+            if depth == self.depth:
+                node.col_to_play = None
+                raise SearchTimeout()
+
+    board = Game((Player('X'), Player('O'))).board
+    for i, col in enumerate((3, 3, 2, 4)):
+        board.insert(col, 'XO'[i % 2])
+
+    player1 = InterruptedMinimax('X', depth=4, algorithm='pvs',
+                                 endgame_cells=0)
+    player2 = Minimax('X', depth=3, algorithm='pvs', endgame_cells=0)
+    for player in (player1, player2):
+        Game((player, Player('O')), verbose=False)
+    assert player1.play(board) == player2.play(board)
+
+
+def test_reuse_state():
+
+    player1 = Minimax('X', depth=3)
+    player2 = Minimax('O', depth=3, reuse_state=False)
+    g = Game((player1, player2))
+
+    col = player1.play(g.board)
+    assert player1.pv[0] == col
+    assert player1.tt is not None and player2.tt is None
+
+    # the Zobrist numbers are only built again for another geometry
+    zobrist = player1.zobrist
+    player1.play(g.board)
+    assert player1.zobrist is zobrist
+    player1.zobrist_for(Board(4, 5))
+    assert player1.zobrist is not zobrist
+    player1.zobrist_for(g.board)
+    assert player1.history and not player2.history
+
+    # the game follows the principal variation
+    player1.pv = [col, 2, 5]
+    player1.observe(col, 'X')
+    player1.observe(2, 'O')
+    player1.reroot()
+    assert player1.pv == [5]
+
+    # the game doesn't
+    player1.pv = [col, 2, 5]
+    player1.observe(col, 'X')
+    player1.observe(3, 'O')
+    player1.reroot()
+    assert player1.pv == []
+
+    player1.reset()
+    assert not player1.history
+    assert player1.tt.probe(player1.zobrist.key(g.board)) is None
+    g.run()
+
+
+def test_solve():
+
+    def negamax(board, coin, other, to_win, empty):
+        # Brute force value of a position for the player to move: n (or -n)
+        # for a win (or loss) whose last move is played with n empty cells
+        # left.
+        best = 0 if board.is_full() else -empty
+        for col in list(board.free_columns()):
+            row = board.insert(col, coin)
+            if board.connects(row, col, to_win):
+                value = empty
+            else:
+                value = -negamax(board, other, coin, to_win, empty - 1)
+            board.remove(col)
+            best = max(best, value)
+        return best
+
+    def to_score(value, empty):
+        if value > 0:
+            return Minimax.WIN - (empty - value + 1)
+        elif value < 0:
+            return -Minimax.WIN + (empty + value + 1)
+        return 0
+
+    rng = random.Random(0)
+    for _ in range(20):
+        player1 = Minimax('X')
+        g = Game((player1, Player('O')), n_rows=4, n_cols=4, to_win=3)
+        for i in range(rng.randint(4, 10)):
+            col = rng.choice(list(g.board.free_columns()))
+            g.board.insert(col, 'XO'[i % 2])
+        empty = 16 - sum(1 for _ in g.board.occupied())
+        if g.check_winner() is not None or empty % 2:
+            continue
+
+        expected = negamax(g.board, 'X', 'O', 3, empty)
+        node = player1.solve(g.board)
+        assert node.score == to_score(expected, empty)
+
+        # the chosen column leads to the same score
+        row = g.board.insert(node.col_to_play, 'X')
+        if not g.board.connects(row, node.col_to_play, 3):
+            assert -negamax(g.board, 'O', 'X', 3, empty - 1) == expected
+
+    # An immediate win is played rather than a slower forced one.
+    player1 = Minimax('X', endgame_cells=20)
+    g = Game((player1, Player('O')), n_rows=4, n_cols=5, to_win=3,
+             verbose=False)
+    for col, coin in ((4, 'X'), (0, 'O'), (4, 'X'), (0, 'O')):
+        g.board.insert(col, coin)
+    node = player1.solve(g.board)
+    assert (node.col_to_play, node.score) == (4, Minimax.WIN - 1)
+    assert player1.play(g.board) == 4
+
+
+def test_endgame_cells():
+
+    player1 = Minimax('X', depth=1, endgame_cells=16)
+    player2 = Minimax('O', depth=1, endgame_cells=0)
+    g = Game((player1, player2), n_rows=4, n_cols=4, to_win=3)
+    assert player1.solves_endgame(g.board)
+    assert not player2.solves_endgame(g.board)
+    g.run()
+    assert len(player1.endgame_cache)
+
+    auto = Minimax('X', endgame_cells='auto')
+    g = Game((auto, player2))
+    assert not auto.solves_endgame(g.board)
+    auto._max_search_nodes = 1e6
+    assert auto.solves_endgame(g.board) == (7 ** (42 * .3) * .15 <= 1e6)
+
+
+def test_endgame_cells_large_board():
+
+    # The solve estimate used to overflow on large boards
+    player1, player2 = Minimax('X', depth=2), Minimax('O', depth=2)
+    g = Game((player1, player2), 50, 50, to_win=5, sparse=True,
+             verbose=False)
+    for i in range(6):
+        player = (player1, player2)[i % 2]
+        col = player.play(g.board)
+        g.board.insert(col, player.coin)
+        player1.observe(col, player.coin)
+        player2.observe(col, player.coin)
+    player1._max_search_nodes = 1e300
+    assert not player1.solves_endgame(g.board)
+
+
+def test_time_budget():
+
+    player1 = Minimax('X', depth=20, endgame_cells=0)
+    player2 = Minimax('O', depth=20, endgame_cells=0, algorithm='pvs')
+    g = Game((player1, player2), time_control=(2, 0), verbose=False)
+    g.run()
+
+    # No player runs out of time, even with a huge depth.
+    assert g.flagged is None
+    assert max(seconds for (_, _, seconds) in g.moves) < .5
+    assert all(clock > 0 for clock in g.clocks.values())
+
+    # Exact solves fall back to the search when they take too long, and
+    # aren't started when they are estimated to exceed the budget.
+    player1 = Minimax('X', depth=4, endgame_cells=42)
+    player2 = Minimax('O', depth=4, endgame_cells=26)
+    g = Game((player1, player2), time_control=(2, 0), verbose=False)
+    g.run()
+    assert g.flagged is None
+    assert max(seconds for (_, _, seconds) in g.moves) < .5
+
+
+def test_win_distance():
+
+    player1 = Minimax('X', depth=4, endgame_cells=0)
+    player2 = Player('O')
+    g = Game((player1, player2), verbose=False)
+
+    # X wins right away in column 3 (or column 4 on the next move).
+    for col in (0, 1, 2):
+        g.board.insert(col, 'X')
+        g.board.insert(col, 'O')
+    g.board.insert(4, 'X')
+    g.board.insert(4, 'O')
+    g.board.insert(5, 'X')
+    g.board.insert(6, 'O')
+
+    assert player1.play(g.board) == 3
+    node = player1.root_node(g.board)
+    player1.minimax(node, 4, -player1.INF, player1.INF)
+    assert node.score == player1.WIN - 1
+
+    # win scores are stored relative to the node
+    for score in (3, player1.WIN - 5, -player1.WIN + 6):
+        stored = player1.to_table(score, ply=2)
+        assert player1.from_table(stored, ply=2) == score
+    assert player1.to_table(player1.WIN - 5, ply=2) == player1.WIN - 3
@@ -0,0 +1,72 @@
+"""
+This module tests the profiling helpers.
+"""
+
+import argparse
+import io
+import pstats
+
+import pytest
+
+from connect4 import Board
+from connect4 import Game
+from connect4 import Minimax
+from connect4 import Player
+from connect4 import profiling
+from connect4.game import BaseBoard
+
+
+def test_timing():
+
+    original = Minimax.utility
+    board = Board(6, 7)
+
+    with profiling.timing() as timings:
+        timings.clear()
+        assert Minimax.utility is not original
+        g = Game((Minimax('X', depth=2), Player('O')), verbose=False)
+        g.run()
+        board.winning_coin(4)
+
+    assert Minimax.utility is original
+    assert timings.calls['evaluation'] > 0
+    assert timings.calls['moves'] > 0
+    assert timings.calls['win_check'] > 0
+    assert 'evaluation' in timings.report()
+
+    # disabled hooks record nothing
+    n_calls = dict(timings.calls)
+    board.winning_coin(4)
+    assert timings.calls == n_calls
+
+    profiling.enable_timing(['evaluation'])
+    assert Board.winning_coin is BaseBoard.__dict__['winning_coin']
+    profiling.disable_timing()
+    assert Minimax.utility is original
+
+
+def test_profile(tmpdir):
+
+    path = str(tmpdir.join('game.prof'))
+    out = io.StringIO()
+    board = Board(6, 7)
+    assert profiling.profile(board.insert, (3, 'X'), path=path,
+                             stream=out) == 5
+    assert 'insert' in out.getvalue()
+    assert any(f[2] == 'insert' for f in pstats.Stats(path).stats)
+
+    parser = argparse.ArgumentParser()
+    profiling.add_arguments(parser)
+    args = parser.parse_args(['--profile', path, '-timings'])
+    assert args.profile == path and args.timings
+    assert profiling.run(args, board.winning_coin, 4) is None
+    assert Board.winning_coin is BaseBoard.__dict__['winning_coin']
+
+    # -profile never swallows a positional argument
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='+')
+    profiling.add_arguments(parser)
+    args = parser.parse_args(['-profile', path, 'games.txt'])
+    assert args.profile == path and args.paths == ['games.txt']
+    with pytest.raises(SystemExit):
+        parser.parse_args(['games.txt', '-profile'])
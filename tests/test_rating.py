@@ -0,0 +1,148 @@
+"""
+This module tests the rating engine.
+"""
+
+import random
+
+import pytest
+
+from connect4 import Game
+from connect4 import Minimax
+from connect4 import Player
+from connect4.rating import Ratings
+from connect4.rating import parse_results
+from connect4.rating import player_name
+
+
+def test_ratings():
+
+    rng = random.Random(0)
+    strength = {'a': 0, 'b': 200, 'c': 400}
+    games = []
+    for _ in range(600):
+        name1, name2 = rng.sample(sorted(strength), 2)
+        e = 1 / (1 + 10**((strength[name2] - strength[name1]) / 400))
+        games.append((name1, name2, 1. if rng.random() < e else 0.))
+
+    for system in Ratings.SYSTEMS:
+        ratings = Ratings(system)
+        ratings.update('a', 'b', .5)
+        widths = [ratings.interval('a')[1] - ratings.interval('a')[0]]
+        ratings.update_all(games[:300])
+        widths.append(ratings.interval('a')[1] - ratings.interval('a')[0])
+        ratings.update_all(games[300:])
+        widths.append(ratings.interval('a')[1] - ratings.interval('a')[0])
+        assert widths[0] > widths[1] > widths[2]
+
+        standings = ratings.standings()
+        assert [row['name'] for row in standings] == ['c', 'b', 'a']
+        assert sum(row['games'] for row in standings) == 2 * 601
+        assert ratings.n_games == 601
+        # the ratings are about 200 points apart, as they should be
+        for row, expected in zip(standings, (200, 0, -200)):
+            low, high = row['interval']
+            assert low < row['rating'] < high
+            assert abs(row['rating'] - standings[1]['rating'] -
+                       expected) < 100
+        assert 'c' in ratings.table()
+
+    with pytest.raises(ValueError):
+        Ratings('trueskill')
+
+
+def test_elo_zero_sum():
+
+    ratings = Ratings('elo', k=32)
+    ratings.update('a', 'b', 1)
+    assert ratings.players['a'].rating == 1516
+    assert ratings.players['b'].rating == 1484
+    assert ratings.interval('a')[0] < 1516 < ratings.interval('a')[1]
+    ratings._get('c')
+    assert ratings.interval('c') == (float('-inf'), float('inf'))
+
+
+def test_checkpoint(tmpdir):
+
+    path = str(tmpdir.join('ratings.json'))
+    ratings = Ratings('glicko', c=10)
+    ratings.update_all([('a', 'b', 1), ('b', 'c', .5)])
+    ratings.save(path)
+
+    loaded = Ratings.load(path)
+    assert loaded.c == 10 and loaded.n_games == 2
+    assert loaded.table() == ratings.table()
+
+    # rating from a checkpoint is the same as rating everything at once
+    loaded.update('c', 'a', 0)
+    ratings.update('c', 'a', 0)
+    assert loaded.table() == ratings.table()
+
+
+def test_update_file(tmpdir):
+
+    results = tmpdir.join('results.txt')
+    path = str(tmpdir.join('ratings.json'))
+    results.write('a b 1\n# comment\nb c 0.5\nc a')
+
+    ratings = Ratings()
+    ratings.update_file(str(results))
+    ratings.save(path)
+
+    # the games already rated are skipped, the last line wasn't complete
+    ratings = Ratings.load(path)
+    ratings.update_file(str(results))
+    assert ratings.n_games == 2
+    results.write(' 0\n', mode='a')
+    ratings.update_file(str(results))
+    assert ratings.n_games == 3
+    assert ratings.players['a'].wins == 2
+
+
+def test_update_game():
+
+    player1 = Minimax('X', depth=1)
+    player2 = Player('O')
+    player2.name = 'random'
+    assert player_name(player1) == 'Minimax(depth=1)'
+    assert player_name(Player('X')) == 'Player'
+
+    ratings = Ratings()
+    for _ in range(3):
+        g = Game((player1, player2), n_rows=4, n_cols=4, verbose=False)
+        g.run()
+        ratings.update_game(g)
+    assert sorted(ratings.players) == ['Minimax(depth=1)', 'random']
+    assert ratings.n_games == 3
+
+    ratings.update_game(g, names={player1: 'minimax'})
+    assert 'minimax' in ratings.players
+
+    # variants of the same engine are rated separately
+    player1, player2 = Minimax('X', depth=5), Minimax('O', depth=5)
+    assert player_name(player1) == player_name(player2)
+    player2.algorithm = 'pvs'
+    assert player_name(player2) == 'Minimax(depth=5, algorithm=pvs)'
+    assert player_name(Minimax('X', depth=5, aspiration=10)) == (
+        'Minimax(depth=5, aspiration=10)')
+
+    # identical engines need names
+    g = Game((player1, Minimax('O', depth=5)), verbose=False)
+    g.winner = g.player1
+    with pytest.raises(ValueError):
+        ratings.update_game(g)
+    with pytest.raises(ValueError):
+        ratings.update('a', 'a', 1)
+    assert 'Minimax(depth=5)' not in ratings.players
+    ratings.update_game(g, names={player1: 'a', g.player2: 'b'})
+    assert ratings.players['a'].wins == 1
+
+
+def test_parse_results():
+
+    lines = ['# round 1', 'a b 1-0', '', 'b c 1/2-1/2', 'c a 0']
+    assert list(parse_results(lines)) == [('a', 'b', 1.), ('b', 'c', .5),
+                                          ('c', 'a', 0.)]
+    with pytest.raises(ValueError):
+        list(parse_results(['a b 2']))
+    with pytest.raises(ValueError):
+        list(parse_results(['a b']))
@@ -0,0 +1,116 @@
+"""
+This module tests the replay engine.
+"""
+
+import random
+
+import pytest
+
+from connect4 import Board
+from connect4 import Game
+from connect4 import Minimax
+from connect4 import Player
+from connect4.replay import Replayer
+from connect4.replay import parse_moves
+from connect4.replay import replay_files
+from connect4.replay import replay_lines
+
+
+def random_game(rng, n_rows=6, n_cols=7, to_win=4):
+    # Play a random game with the slow Board, and return its columns, winner
+    # and length.
+    board = Board(n_rows, n_cols)
+    moves = []
+    while not board.is_full():
+        col = rng.choice(list(board.free_columns()))
+        board.insert(col, 'XO'[len(moves) % 2])
+        moves.append(col)
+        if board.winning_coin(to_win) is not None:
+            return moves, 'XO'[(len(moves) - 1) % 2]
+    return moves, None
+
+
+def test_parse_moves():
+
+    assert parse_moves('4453\n') == (3, 3, 4, 2)
+    assert parse_moves('4, 12 ,1') == (3, 11, 0)
+    assert parse_moves('10 1') == (9, 0)
+    with pytest.raises(ValueError):
+        parse_moves('44a')
+
+
+def test_replay():
+
+    rng = random.Random(0)
+    replayer = Replayer()
+    for _ in range(50):
+        moves, winner = random_game(rng)
+        r = replayer.replay(moves)
+        assert r['winner'] == winner
+        assert r['result'] == ('win' if winner else 'draw')
+        assert r['ply'] == len(moves)
+        assert r['error'] is None and r['evaluations'] is None
+
+        if len(moves) > 1:
+            r = replayer.replay(moves[:-1])
+            assert r['result'] == 'unfinished' and r['ply'] is None
+
+    r = replayer.replay([0, 1, 0, 1, 0, 1, 0, 2])
+    assert (r['result'], r['ply']) == ('illegal', 8)
+    r = replayer.replay([0] * 7)
+    assert (r['result'], r['ply']) == ('illegal', 7)
+    assert replayer.replay([7])['result'] == 'illegal'
+
+    # draws on a tiny board
+    r = Replayer(2, 2, 3).replay([0, 0, 1, 1])
+    assert (r['result'], r['ply']) == ('draw', 4)
+
+
+def test_replay_evaluate():
+
+    random.seed(0)
+    player1 = Minimax('X', depth=2, reuse_state=False)
+    g = Game((player1, Player('O')), verbose=False)
+    g.run()
+    moves = [col for _, col, _ in g.moves]
+
+    r = Replayer(evaluate='search', depth=2).replay(moves)
+    assert len(r['evaluations']) == len(moves)
+    if r['result'] == 'win':
+        # the winner saw the win coming at its last move
+        assert r['evaluations'][-1][0] > Minimax.WIN_THRESHOLD
+
+    r = Replayer(evaluate='utility').replay(moves[:3])
+    assert [col for _, col in r['evaluations']] == [None] * 3
+
+    with pytest.raises(ValueError):
+        Replayer(evaluate='mcts')
+
+
+def test_replay_files(tmpdir):
+
+    rng = random.Random(1)
+    paths, expected = [], []
+    for i in range(3):
+        lines = ['# games {0}'.format(i), '']
+        for _ in range(20):
+            moves, winner = random_game(rng)
+            lines.append(''.join(str(col + 1) for col in moves))
+            expected.append(winner)
+        lines.append('12x')
+        expected.append('invalid')
+        path = tmpdir.join('games{0}.txt'.format(i))
+        path.write('\n'.join(lines) + '\n')
+        paths.append(str(path))
+
+    for processes in (1, 2):
+        results = list(replay_files(paths, processes=processes,
+                                    chunk_size=7))
+        assert [r['winner'] if r['error'] is None else 'invalid'
+                for r in results] == expected
+        assert results[0]['source'] == paths[0]
+        assert results[0]['line'] == 3
+        assert results[-1]['line'] == 23
+
+    results = list(replay_lines(['1212121'], Replayer()))
+    assert results[0]['winner'] == 'X' and results[0]['source'] is None
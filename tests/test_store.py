@@ -0,0 +1,125 @@
+"""
+This module tests the persistent store.
+"""
+
+import multiprocessing
+import os
+
+from connect4 import Game
+from connect4 import Minimax
+from connect4 import Player
+from connect4.store import PersistentStore
+from connect4.store import compact
+
+
+def _write_entries(path, start):
+
+    store = PersistentStore(path)
+    for key in range(start, start + 50):
+        store.store(key * 7919, key, store.EXACT, key % 10, key % 7)
+    store.close()
+
+
+def test_store(tmpdir):
+
+    path = str(tmpdir.join('results.c4tt'))
+    store = PersistentStore(path, mb=.001)
+    assert os.path.getsize(path) == (PersistentStore.HEADER_SIZE +
+                                     store.n_slots * store.SLOT_SIZE)
+    assert store.probe(1) is None
+
+    # collisions are resolved by the next slots
+    store.store(1, 2, store.LOWER, 3, 4)
+    store.store(1 + store.n_slots, 5, store.UPPER, 1, None)
+    assert store.probe(1) == (2, store.LOWER, 3, 4)
+    assert store.probe(1 + store.n_slots) == (5, store.UPPER, 1, None)
+
+    # shallower entries don't replace deeper ones
+    store.store(1, 0, store.EXACT, 2, 0)
+    assert store.probe(1) == (2, store.LOWER, 3, 4)
+    store.close()
+
+    # entries persist
+    store = PersistentStore(path)
+    assert store.probe(1) == (2, store.LOWER, 3, 4)
+    assert len(store) == 2
+
+    # once all the slots of a key are used, the shallowest entry goes
+    for i in range(2, store.PROBES + 1):
+        store.store(1 + i * store.n_slots, 0, store.EXACT, 5, None)
+    assert store.probe(1 + store.n_slots) is None
+    assert store.probe(1) == (2, store.LOWER, 3, 4)
+    store.close()
+
+
+def test_concurrent_writes(tmpdir):
+
+    path = str(tmpdir.join('results.c4tt'))
+    PersistentStore(path, mb=1).close()
+
+    processes = [multiprocessing.Process(target=_write_entries,
+                                         args=(path, 50 * i))
+                 for i in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+
+    store = PersistentStore(path)
+    for key in range(200):
+        assert store.probe(key * 7919) == (key, store.EXACT, key % 10,
+                                           key % 7)
+    store.close()
+
+
+def test_compact(tmpdir):
+
+    path = str(tmpdir.join('results.c4tt'))
+    _write_entries(path, 0)
+
+    assert compact(path, mb=.01, min_depth=5) == (50, 25)
+    store = PersistentStore(path)
+    assert store.n_slots == int(.01 * 2**20) // store.SLOT_SIZE
+    assert all(depth >= 5 for (_, _, _, depth, _) in store.entries())
+    assert store.probe(9 * 7919) == (9, store.EXACT, 9, 2)
+    store.close()
+
+
+def test_replaced_file(tmpdir):
+
+    path = str(tmpdir.join('results.c4tt'))
+    store = PersistentStore(path, mb=.01)
+
+    # a concurrent creation doesn't replace the file
+    PersistentStore._create(path, 2 * store.n_slots)
+    other = PersistentStore(path)
+    assert other.n_slots == store.n_slots
+    other.close()
+    assert os.listdir(str(tmpdir)) == ['results.c4tt']
+
+    # writes after a compaction go to the new file
+    store.store(1, 2, store.EXACT, 3, 4)
+    compact(path, mb=.02)
+    store.store(5, 6, store.EXACT, 7, None)
+    store.close()
+    store = PersistentStore(path)
+    assert store.n_slots == int(.02 * 2**20) // store.SLOT_SIZE
+    assert store.probe(1) == (2, store.EXACT, 3, 4)
+    assert store.probe(5) == (6, store.EXACT, 7, None)
+    store.close()
+
+
+def test_minimax_store(tmpdir):
+
+    path = str(tmpdir.join('results.c4tt'))
+
+    n_nodes = []
+    for _ in range(2):
+        player1 = Minimax('X', depth=4, store=path)
+        g = Game((player1, Player('O')), verbose=False)
+        player1.play(g.board)
+        n_nodes.append(player1.n_nodes)
+        player1.close()
+
+    # the second search only needs to read the root children in the store
+    assert n_nodes[1] < n_nodes[0]
@@ -0,0 +1,121 @@
+"""
+This module tests the tablebase generator and player.
+"""
+
+import os
+import random
+
+import pytest
+
+from connect4 import Board
+from connect4 import Game
+from connect4 import Minimax
+from connect4 import Tablebase
+from connect4.tablebase import DRAW
+from connect4.tablebase import LOSS
+from connect4.tablebase import WIN
+from connect4.tablebase import Bitboards
+from connect4.tablebase import TablebaseFile
+from connect4.tablebase import generate
+
+
+def negamax(board, coin, other, to_win):
+    # Brute force (result, distance) of a position for the player to move.
+    values = []
+    for col in list(board.free_columns()):
+        row = board.insert(col, coin)
+        if board.connects(row, col, to_win):
+            board.remove(col)
+            return WIN, 1
+        if board.is_full():
+            values.append((DRAW, 1))
+        else:
+            result, distance = negamax(board, other, coin, to_win)
+            values.append(({WIN: LOSS, DRAW: DRAW, LOSS: WIN}[result],
+                           distance + 1))
+        board.remove(col)
+
+    def rank(value):
+        result, distance = value
+        return {WIN: 1000 - distance, DRAW: 0, LOSS: -1000 + distance}[result]
+
+    return max(values, key=rank)
+
+
+@pytest.fixture(scope='module')
+def tablebase_path(tmpdir_factory):
+
+    path = str(tmpdir_factory.mktemp('tablebase').join('4x4x3.c4tb'))
+    generate(path, 4, 4, to_win=3)
+    return path
+
+
+def test_bitboards():
+
+    bitboards = Bitboards(6, 7, 4)
+    rng = random.Random(0)
+    for _ in range(20):
+        board = Board(6, 7)
+        for i in range(42):
+            col = rng.choice(list(board.free_columns()))
+            board.insert(col, 'XO'[i % 2])
+            first, mask = bitboards.from_board(board, 'X')
+            assert (bitboards.decode(bitboards.key(first, mask)) ==
+                    (first, mask))
+            winner = board.winning_coin(4)
+            assert bitboards.wins(first) == (winner == 'X')
+            assert bitboards.wins(mask ^ first) == (winner == 'O')
+            if winner is not None:
+                break
+
+
+def test_generate(tablebase_path):
+
+    table = TablebaseFile(tablebase_path)
+    assert (table.n_rows, table.n_cols, table.to_win) == (4, 4, 3)
+    assert table.n_positions == 23948
+    assert os.path.getsize(tablebase_path) == (table.HEADER_SIZE +
+                                               8 * table.n_slots)
+    table.close()
+
+    player = Tablebase('X', tablebase_path)
+    rng = random.Random(0)
+    for _ in range(30):
+        board = Board(4, 4)
+        for i in range(rng.randint(4, 9)):
+            col = rng.choice(list(board.free_columns()))
+            row = board.insert(col, 'XO'[i % 2])
+            if board.connects(row, col, 3):
+                board.remove(col)
+                break
+        n_coins = len(list(board.occupied()))
+        coin, other = ('X', 'O') if n_coins % 2 == 0 else ('O', 'X')
+        if board.winning_coin(3) is None and not board.is_full():
+            assert (player.probe(board, coin) ==
+                    negamax(board, coin, other, 3))
+    player.close()
+
+    with pytest.raises(ValueError):
+        generate(tablebase_path, 8, 6)
+
+
+def test_tablebase_player(tablebase_path):
+
+    # The first player wins 4x4 boards with to_win=3, and the tablebase
+    # wins as fast as possible.
+    player = Tablebase('X', tablebase_path)
+    result, distance = player.probe(Board(4, 4), 'X')
+    assert result == WIN
+    g = Game((player, Minimax('O', depth=3)), n_rows=4, n_cols=4, to_win=3,
+             verbose=False)
+    assert g.run() is player
+    assert len(g.moves) <= distance
+
+    g = Game((player, Tablebase('O', tablebase_path)), n_rows=4, n_cols=4,
+             to_win=3, verbose=False)
+    assert g.run() is player
+    assert len(g.moves) == distance
+
+    with pytest.raises(ValueError):
+        Game((player, Minimax('O')), verbose=False).run()
+    player.close()